@@ -0,0 +1,141 @@
+import asyncio
+import contextlib
+import math
+import time
+from collections import deque
+
+import metrics
+
+# Bounded admission in front of the scorer: at most `max_inflight` requests
+# run at once and at most `max_queue` wait for a slot, first come first
+# served. A caller is shed with QueueFull (the server answers 503 with
+# Retry-After) when the queue is full, when the wait it can expect, from the
+# queue ahead of it and the recent time a slot is held, is already longer
+# than its queue deadline, or when the deadline passes while it waits. So an
+# overloaded server turns requests away in milliseconds instead of letting
+# every client time out together.
+#
+# The server keeps one Admission per lane: requests it can answer from cache
+# go through their own, so they never queue behind upstream-bound scorings.
+
+
+class QueueFull(Exception):
+    # retry_after: seconds a client should wait before trying again
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Admission:
+    def __init__(self, max_inflight: int, max_queue: int, queue_timeout_s: float = 10.0, name: str = "score"):
+        self.name = name
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+        self.inflight = 0
+        self.waiters = deque()
+        self.service_s = None   # moving average of how long a slot is held
+        self.admitted = 0
+        self.wait_total_s = 0.0
+        self.max_wait_s = 0.0
+        self.shed = {"full": 0, "predicted": 0, "deadline": 0}
+
+    @property
+    def waiting(self) -> int:
+        return len(self.waiters)
+
+    def expected_wait(self) -> float:
+        # seconds until a newcomer would get a slot: the queue ahead drains
+        # max_inflight at a time, each slot held for about service_s
+        if self.inflight < self.max_inflight and not self.waiters:
+            return 0.0
+        return (len(self.waiters) + 1) * (self.service_s or 0.0) / self.max_inflight
+
+    def retry_after(self) -> int:
+        return max(1, min(60, math.ceil(self.expected_wait())))
+
+    def _shed(self, reason: str, message: str):
+        self.shed[reason] += 1
+        metrics.inc("admission_shed", lane=self.name, reason=reason)
+        raise QueueFull(message, self.retry_after())
+
+    def _admitted(self, waited: float):
+        self.admitted += 1
+        self.wait_total_s += waited
+        self.max_wait_s = max(self.max_wait_s, waited)
+        metrics.observe("admission_wait", waited, lane=self.name)
+
+    def _wake(self):
+        while self.waiters and self.inflight < self.max_inflight:
+            fut = self.waiters.popleft()
+            if not fut.done():
+                self.inflight += 1
+                fut.set_result(None)
+
+    async def acquire(self, timeout_s: float = None) -> float:
+        # -> start time for release(); timeout_s can only shorten queue_timeout_s
+        timeout = self.queue_timeout_s if timeout_s is None else min(timeout_s, self.queue_timeout_s)
+        if not self.waiters and self.inflight < self.max_inflight:
+            self.inflight += 1
+            self._admitted(0.0)
+            return time.monotonic()
+        if len(self.waiters) >= self.max_queue:
+            self._shed("full", f"admission queue full ({len(self.waiters)} waiting)")
+        if self.expected_wait() > timeout:
+            self._shed("predicted", f"expected queue wait {self.expected_wait():.1f}s exceeds {timeout:.1f}s")
+
+        queued = time.monotonic()
+        fut = asyncio.get_running_loop().create_future()
+        self.waiters.append(fut)
+        try:
+            await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            # the slot may have been granted just as the deadline hit: keep it
+            if not (fut.done() and not fut.cancelled()):
+                with contextlib.suppress(ValueError):
+                    self.waiters.remove(fut)
+                self._shed("deadline", f"no slot within {timeout:.1f}s")
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # granted a slot just as we were cancelled: pass it on
+                self.inflight -= 1
+                self._wake()
+            else:
+                with contextlib.suppress(ValueError):
+                    self.waiters.remove(fut)
+            raise
+        now = time.monotonic()
+        self._admitted(now - queued)
+        return now
+
+    def release(self, started: float = None):
+        self.inflight -= 1
+        if started is not None:
+            held = time.monotonic() - started
+            self.service_s = held if self.service_s is None else self.service_s + (held - self.service_s) * 0.1
+        self._wake()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, timeout_s: float = None):
+        started = await self.acquire(timeout_s)
+        try:
+            yield
+        finally:
+            self.release(started)
+
+    def stats(self) -> dict:
+        return {
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "waiting": len(self.waiters),
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "avg_wait_ms": round(self.wait_total_s / self.admitted * 1000.0, 1) if self.admitted else 0.0,
+            "max_wait_ms": round(self.max_wait_s * 1000.0, 1),
+            "expected_wait_ms": round(self.expected_wait() * 1000.0, 1),
+            "service_ms": round(self.service_s * 1000.0, 1) if self.service_s is not None else None,
+            "rejected": sum(self.shed.values()),
+            "shed_full": self.shed["full"],
+            "shed_predicted": self.shed["predicted"],
+            "shed_deadline": self.shed["deadline"],
+        }
@@ -0,0 +1,99 @@
+import asyncio
+
+# Packs the agent inputs of several coins into one message per assistant.
+#
+# Callers submit (coin key, payload) and wait. A batch is sent once it holds
+# `max_batch` coins or `linger_s` after its first coin arrived, whichever
+# comes first. The reply is expected to be one JSON object keyed by coin;
+# each waiter gets its own entry, or BatchMiss if the entry is missing or not
+# an object, so the caller can fall back to a single-coin call. A waiter that
+# gives up (timeout, cancelled scoring) doesn't cancel the batch for others.
+
+
+class BatchMiss(Exception):
+    pass
+
+
+class AgentBatcher:
+    # send(items) -> awaitable raw reply for [(key, payload), ...];
+    # parse(raw) -> dict keyed by coin (raises on unparseable replies)
+    def __init__(self, send, parse, max_batch: int = 8, linger_s: float = 0.05, timeout_s: float = 60.0):
+        self.send = send
+        self.parse = parse
+        self.max_batch = max(1, max_batch)
+        self.linger_s = linger_s
+        self.timeout_s = timeout_s
+        self.pending = []       # [(key, payload, future)]
+        self.batches = 0
+        self.items = 0
+        self.misses = 0
+        self.failures = 0
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, key: str, payload) -> dict:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self.pending.append((key, payload, fut))
+        if len(self.pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.linger_s, self._flush)
+        return await fut
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self.pending:
+            batch, self.pending = self.pending[:self.max_batch], self.pending[self.max_batch:]
+            batch = [item for item in batch if not item[2].done()]
+            if batch:
+                task = asyncio.ensure_future(self._run(batch))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list):
+        # the same coin twice in one batch (e.g. two tiers) is asked once
+        waiters = {}
+        payloads = {}
+        for key, payload, fut in batch:
+            waiters.setdefault(key, []).append(fut)
+            payloads.setdefault(key, payload)
+        self.batches += 1
+        self.items += len(payloads)
+
+        try:
+            raw = await asyncio.wait_for(self.send(list(payloads.items())), self.timeout_s)
+            entries = self.parse(raw)
+            if not isinstance(entries, dict):
+                raise BatchMiss(f"batched reply is a {type(entries).__name__}, not an object keyed by coin")
+        except Exception as e:
+            self.failures += 1
+            for futs in waiters.values():
+                for fut in futs:
+                    if not fut.done():
+                        fut.set_exception(e if isinstance(e, BatchMiss) else BatchMiss(f"batch failed: {e}"))
+            return
+
+        for key, futs in waiters.items():
+            entry = entries.get(key)
+            if not isinstance(entry, dict):
+                self.misses += 1
+            for fut in futs:
+                if fut.done():
+                    continue
+                if isinstance(entry, dict):
+                    fut.set_result(dict(entry))
+                else:
+                    fut.set_exception(BatchMiss(f"coin '{key}' missing from the batched reply"))
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch": round(self.items / self.batches, 2) if self.batches else None,
+            "pending": len(self.pending),
+            "misses": self.misses,
+            "failures": self.failures,
+        }
@@ -0,0 +1,121 @@
+import copy
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from collections import OrderedDict
+
+# Content-addressed cache of parsed agent verdicts.
+#
+# The key is sha256(assistant_id, prompt): the prompt embeds every input the
+# agent sees, so a byte-identical prompt to the same assistant can reuse the
+# earlier answer. Two tiers: a bounded in-memory LRU, and one JSON file per
+# verdict under <disk_dir>/<assistant_id>/ that survives restarts. Recreating
+# the assistants (create_assistants.py) must call invalidate().
+
+DEFAULT_DIR = "backboard/.cache/agents"
+
+
+def cache_key(assistant_id: str, prompt: str) -> str:
+    h = hashlib.sha256()
+    h.update(assistant_id.encode("utf-8"))
+    h.update(b"\0")
+    h.update(prompt.encode("utf-8"))
+    return h.hexdigest()
+
+
+class AgentCache:
+    def __init__(self, max_entries: int = 1024, disk_dir: str = DEFAULT_DIR):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, assistant_id: str, key: str) -> str:
+        return os.path.join(self.disk_dir, assistant_id or "_", key + ".json")
+
+    def _remember(self, key: str, assistant_id: str, result: dict):
+        self.memory[key] = (assistant_id, result)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, assistant_id: str, prompt: str):
+        # -> (result or None, "memory" / "disk" / "miss")
+        key = cache_key(assistant_id, prompt)
+
+        hit = self.memory.get(key)
+        if hit is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(hit[1]), "memory"
+
+        if self.disk_dir:
+            try:
+                with open(self._path(assistant_id, key), "r", encoding="utf-8") as f:
+                    result = json.load(f)["result"]
+            except (OSError, ValueError, KeyError):
+                result = None
+            if result is not None:
+                self._remember(key, assistant_id, result)
+                self.disk_hits += 1
+                return copy.deepcopy(result), "disk"
+
+        self.misses += 1
+        return None, "miss"
+
+    def put(self, assistant_id: str, prompt: str, result: dict):
+        key = cache_key(assistant_id, prompt)
+        self._remember(key, assistant_id, copy.deepcopy(result))
+
+        if not self.disk_dir:
+            return
+        path = self._path(assistant_id, key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"assistant_id": assistant_id, "created_at": time.time(), "result": result},
+                          f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError as e:
+            # the disk tier is best effort; the memory tier still has it
+            print(f"[agent cache] write failed for {path}: {e}", file=sys.stderr)
+
+    def invalidate(self, assistant_ids=None) -> int:
+        # drop cached verdicts for the given assistants, or for all of them
+        if assistant_ids is None:
+            dropped = len(self.memory)
+            self.memory.clear()
+            if self.disk_dir:
+                shutil.rmtree(self.disk_dir, ignore_errors=True)
+            return dropped
+
+        ids = set(assistant_ids)
+        stale = [k for k, (aid, _) in self.memory.items() if aid in ids]
+        for k in stale:
+            del self.memory[k]
+        if self.disk_dir:
+            for aid in ids:
+                shutil.rmtree(os.path.join(self.disk_dir, aid or "_"), ignore_errors=True)
+        return len(stale)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.memory),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
+
+
+if __name__ == "__main__":
+    # python backboard/agent_cache.py [assistant_id ...]  -> clear cached verdicts
+    cache = AgentCache(disk_dir=os.getenv("AGENT_CACHE_DIR", DEFAULT_DIR))
+    cache.invalidate(sys.argv[1:] or None)
+    print("agent cache cleared:", ", ".join(sys.argv[1:]) or "all assistants")
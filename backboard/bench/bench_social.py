@@ -0,0 +1,76 @@
+import json
+import os
+import random
+import sys
+import time
+
+# python backboard/bench/bench_social.py [rows]
+# Times score_social() in a loop against score_social_batch() on the same
+# synthetic rows and checks every row of the batch output matches exactly.
+# Some rows carry the junk upstreams send (NaN, numeric strings, None, bools,
+# unparseable text) so the coercion paths are compared too, and some have an
+# activity count far above the subscriber count, so the rounding of huge
+# ratios is compared as well.
+
+# values swapped into a field of about one row in ten
+JUNK = [float("nan"), "nan", " NaN ", None, "", "abc", " 1250 ", "3.5e4", True, False, -12, "-0.5", 0.0]
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator import score_social
+from social_batch import batch_row, score_social_batch_from_contexts
+
+
+def synthetic_contexts(n: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    ctxs = []
+    for _ in range(n):
+        subs = rng.choice([0, 0, rng.randint(1, 999), int(10 ** rng.uniform(3, 7.5))])
+        up = rng.choice([0, round(rng.uniform(0, 100), 2)])
+        social = {
+            "reddit_subscribers": subs,
+            "reddit_active_accounts_48h": rng.choice([0, int(subs * rng.uniform(0, 0.05))]),
+            "sentiment_votes_up_pct": up,
+            "sentiment_votes_down_pct": round(100 - up, 2) if up else 0,
+        }
+        if rng.random() < 0.6:
+            social["twitter_followers"] = int(10 ** rng.uniform(2, 7.8))
+        if rng.random() < 0.05:
+            social = {}
+        elif rng.random() < 0.1:
+            field = rng.choice(["reddit_subscribers", "reddit_active_accounts_48h", "sentiment_votes_up_pct",
+                                "sentiment_votes_down_pct", "twitter_followers"])
+            social[field] = rng.choice(JUNK)
+        elif rng.random() < 0.02:
+            social["reddit_active_accounts_48h"] = int(10 ** rng.uniform(8, 12))
+        ctxs.append({"social_sentiment": social})
+    return ctxs
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    ctxs = synthetic_contexts(n)
+
+    t0 = time.perf_counter()
+    scalar = [score_social(c) for c in ctxs]
+    t_scalar = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batch = score_social_batch_from_contexts(ctxs)
+    t_batch = time.perf_counter() - t0
+
+    mismatches = [i for i in range(n) if batch_row(batch, i) != scalar[i]]
+
+    print(json.dumps({
+        "rows": n,
+        "scalar_s": round(t_scalar, 4),
+        "batch_s": round(t_batch, 4),
+        "speedup": round(t_scalar / t_batch, 1) if t_batch > 0 else None,
+        "mismatches": len(mismatches),
+        "first_mismatch": mismatches[0] if mismatches else None,
+    }, indent=2))
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
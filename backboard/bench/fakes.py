@@ -0,0 +1,226 @@
+import asyncio
+import json
+import math
+import random
+
+# Local stand-ins for Backboard and the Node context fetcher, so the scoring
+# path can be load-tested without CoinGecko, Alchemy or an LLM behind it.
+#
+# Latencies are given as specs:
+#   "fixed:0.2"            always 200 ms
+#   "uniform:0.1,0.5"      uniform between 100 and 500 ms
+#   "lognormal:0.8,0.4"    median 800 ms, sigma 0.4 (long right tail)
+
+
+def parse_latency(spec: str):
+    kind, _, args = spec.partition(":")
+    nums = [float(x) for x in args.split(",") if x.strip()]
+    if kind == "fixed" and len(nums) == 1:
+        return lambda rng: nums[0]
+    if kind == "uniform" and len(nums) == 2:
+        return lambda rng: rng.uniform(nums[0], nums[1])
+    if kind == "lognormal" and len(nums) == 2:
+        mu = math.log(nums[0])
+        return lambda rng: rng.lognormvariate(mu, nums[1])
+    raise ValueError(f"bad latency spec {spec!r} (fixed:S, uniform:LO,HI or lognormal:MEDIAN,SIGMA)")
+
+
+def add_fake_args(parser):
+    g = parser.add_argument_group("fakes")
+    g.add_argument("--context-latency", default="lognormal:0.6,0.5", help="context fetch latency spec")
+    g.add_argument("--context-error-rate", type=float, default=0.0)
+    g.add_argument("--thread-latency", default="fixed:0.05", help="create_thread latency spec")
+    g.add_argument("--agent-latency", default="lognormal:1.5,0.4", help="add_message latency spec")
+    g.add_argument("--agent-error-rate", type=float, default=0.0)
+    g.add_argument("--malformed-rate", type=float, default=0.0, help="share of agent replies that aren't JSON")
+    g.add_argument("--agent-item-latency", type=float, default=0.15,
+                   help="extra add_message seconds per additional coin in a batched prompt")
+    g.add_argument("--seed", type=int, default=1)
+
+
+FAKE_OPTIONS = ("context_latency", "context_error_rate", "thread_latency", "agent_latency",
+                "agent_error_rate", "malformed_rate", "agent_item_latency", "seed")
+
+
+def fake_argv(args) -> list:
+    # the add_fake_args() options of `args` as argv, for a child process
+    argv = []
+    for name in FAKE_OPTIONS:
+        argv += ["--" + name.replace("_", "-"), str(getattr(args, name))]
+    return argv
+
+
+class _Thread:
+    def __init__(self, thread_id: str):
+        self.thread_id = thread_id
+
+
+class _Message:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class FakeBackboardClient:
+    def __init__(self, thread_latency: str = "fixed:0.05", agent_latency: str = "lognormal:1.5,0.4",
+                 error_rate: float = 0.0, malformed_rate: float = 0.0, seed: int = 1, item_latency: float = 0.15):
+        self.rng = random.Random(seed)
+        self.thread_latency = parse_latency(thread_latency)
+        self.agent_latency = parse_latency(agent_latency)
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.item_latency = item_latency
+        self.threads = 0
+        self.messages = 0
+        self.batched_coins = 0
+        self.streamed_chunks = 0
+        self.deleted = 0
+
+    async def create_thread(self, assistant_id):
+        await asyncio.sleep(self.thread_latency(self.rng))
+        self.threads += 1
+        return _Thread(f"fake-{assistant_id or 'agent'}-{self.threads}")
+
+    @staticmethod
+    def _batch_keys(content) -> list:
+        # coin keys of a batched prompt (orchestrator.build_batch_prompt), else []
+        if not isinstance(content, str) or "score every coin on its own" not in content:
+            return []
+        return list(json.loads(content.rsplit("\n\n", 1)[1]))
+
+    def _verdict(self) -> dict:
+        return {
+            "subscore": round(self.rng.uniform(20, 95), 1),
+            "confidence": round(self.rng.uniform(0.4, 0.95), 2),
+            "flags": self.rng.sample(["Thin volume", "Deep ATH drawdown", "Stale repo", "Concentrated holders"], 1),
+            "explanation": "Synthetic verdict from the benchmark fake.",
+            "details": {"fake": True},
+        }
+
+    def _reply(self, keys: list) -> str:
+        if keys:
+            # a batched reply; a malformed share of coins is simply left out
+            self.batched_coins += len(keys)
+            verdict = {k: self._verdict() for k in keys if self.rng.random() >= self.malformed_rate}
+        elif self.rng.random() < self.malformed_rate:
+            return self.rng.choice([
+                "I'm sorry, I can't score this asset right now.",
+                '{"subscore": 71, "confidence": 0.8, "flags": ["Low liq',
+            ])
+        else:
+            verdict = self._verdict()
+        # agents like to chat around their JSON
+        return "Here is the result:\n" + json.dumps(verdict) + "\nLet me know if you need more."
+
+    def _latency(self, keys: list) -> float:
+        # longer replies take longer: every extra batched coin adds item_latency
+        return self.agent_latency(self.rng) + self.item_latency * max(0, len(keys) - 1)
+
+    async def add_message(self, thread_id, content=None, stream=False, memory=None, **kwargs):
+        keys = self._batch_keys(content)
+        if stream:
+            return self._stream(self._latency(keys), keys)
+        await asyncio.sleep(self._latency(keys))
+        self.messages += 1
+        if self.rng.random() < self.error_rate:
+            raise RuntimeError("fake backboard: 500 Internal Server Error")
+        return _Message(self._reply(keys))
+
+    async def _stream(self, latency: float, keys: list, chunk_chars: int = 16):
+        # the same reply as add_message(), spread evenly over `latency` in small deltas
+        self.messages += 1
+        if self.rng.random() < self.error_rate:
+            await asyncio.sleep(latency)
+            raise RuntimeError("fake backboard: 500 Internal Server Error")
+        reply = self._reply(keys)
+        chunks = [reply[i:i + chunk_chars] for i in range(0, len(reply), chunk_chars)]
+        for chunk in chunks:
+            await asyncio.sleep(latency / len(chunks))
+            self.streamed_chunks += 1
+            yield {"type": "content_streaming", "content": chunk}
+        yield {"type": "message_complete", "content": reply}
+
+    async def delete_thread(self, thread_id):
+        await asyncio.sleep(self.thread_latency(self.rng))
+        self.deleted += 1
+        return {}
+
+    async def aclose(self):
+        pass
+
+
+class FakeContextProvider:
+    # drop-in for orchestrator.context_upstream(coin_name, sections) -> (coin_id, context)
+    def __init__(self, latency: str = "lognormal:0.6,0.5", error_rate: float = 0.0, seed: int = 1):
+        self.rng = random.Random(seed)
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.calls = 0
+
+    def context_for(self, coin_id: str) -> dict:
+        rng = random.Random(coin_id)
+        mc = 10 ** rng.uniform(6, 12)
+        vol = mc * rng.uniform(0.001, 0.3)
+        subs = int(10 ** rng.uniform(2, 6.5))
+        up = round(rng.uniform(30, 95), 2)
+        return {
+            "name": coin_id.title(),
+            "symbol": coin_id[:4].upper(),
+            "age_days": rng.randint(30, 6000),
+            "market_integrity": {
+                "current_price_usd": round(10 ** rng.uniform(-3, 4), 6),
+                "market_cap_usd": mc,
+                "fdv_usd": mc * rng.uniform(1, 3),
+                "volume_24h_usd": vol,
+                "vol_to_mc_ratio": vol / mc,
+                "performance": {k: round(rng.uniform(-30, 30), 3)
+                                for k in ("change_1h", "change_24h", "change_7d", "change_30d", "change_1y")},
+                "extremes": {"ath_usd": 100.0, "ath_change_percent": round(rng.uniform(-95, 0), 2),
+                             "atl_usd": 0.1, "atl_change_percent": round(rng.uniform(0, 50000), 2)},
+            },
+            "dev_velocity": {
+                "stars": rng.randint(0, 80000),
+                "recent_commits_4w": rng.randint(0, 300),
+                "total_issues": 1000,
+                "closed_issues": rng.randint(0, 1000),
+                "issue_resolution_rate": rng.random(),
+                "last_commit_age_days": rng.randint(0, 400),
+            },
+            "on_chain_security": {
+                "deployer_address": "0x" + "%040x" % rng.getrandbits(160),
+                "is_renounced": "Unknown",
+                "has_burned_liquidity": rng.random() < 0.3,
+                "top_holder_concentration": round(rng.uniform(1, 90), 2),
+                "has_logo_verification": True,
+                "is_contract_verified": True,
+            },
+            "social_sentiment": {
+                "reddit_subscribers": subs,
+                "reddit_active_accounts_48h": int(subs * rng.uniform(0, 0.02)),
+                "sentiment_votes_up_pct": up,
+                "sentiment_votes_down_pct": round(100 - up, 2),
+                "reddit_url": f"https://www.reddit.com/r/{coin_id}/",
+                "twitter_handle": coin_id,
+            },
+        }
+
+    async def fetch(self, coin_name: str, sections=None) -> tuple:
+        await asyncio.sleep(self.latency(self.rng))
+        self.calls += 1
+        if self.rng.random() < self.error_rate:
+            raise RuntimeError(f"fake get_context failed for coin='{coin_name}'")
+        coin_id = coin_name.strip().lower()
+        ctx = self.context_for(coin_id)
+        if sections is not None:
+            ctx = {k: v for k, v in ctx.items() if k in ("name", "symbol", "age_days") or k in sections}
+        return coin_id, ctx
+
+
+def install_fakes(orchestrator, args):
+    # route the orchestrator's upstreams to fakes built from add_fake_args() options
+    client = FakeBackboardClient(args.thread_latency, args.agent_latency,
+                                 args.agent_error_rate, args.malformed_rate, args.seed, args.agent_item_latency)
+    provider = FakeContextProvider(args.context_latency, args.context_error_rate, args.seed)
+    orchestrator.get_client = lambda: client
+    # below fetch_context, so the adaptive limiter and retries stay in the path
+    orchestrator.context_upstream = provider.fetch
+    return client, provider
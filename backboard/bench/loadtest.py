@@ -0,0 +1,226 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+# Open-loop load test of the scoring path against bench/fakes.py.
+#
+#   python backboard/bench/loadtest.py --target orchestrator --rate 50 --duration 30
+#   python backboard/bench/loadtest.py --target server --rate 200 --duration 30 --out run.json
+#
+# Requests are fired on a fixed schedule (rate/s) whether or not earlier ones
+# have finished, so queueing shows up in the latency numbers. The report is a
+# single JSON object: throughput, p50/p95/p99 latency, CPU and RSS of the
+# process doing the scoring, plus the git commit, for comparing runs.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from fakes import add_fake_args, fake_argv, install_fakes
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    i = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[i]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def proc_stats(pid: str = "self") -> dict:
+    # cpu seconds and rss of a process, from /proc (Linux)
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        cpu = (int(fields[11]) + int(fields[12])) / ticks
+        mem = {}
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    key, value = line.split(":", 1)
+                    mem[key] = int(value.split()[0]) / 1024.0
+        return {"cpu_s": cpu, "rss_mb": mem.get("VmRSS"), "peak_rss_mb": mem.get("VmHWM")}
+    except (OSError, ValueError, IndexError):
+        if pid != "self":
+            return {"cpu_s": None, "rss_mb": None, "peak_rss_mb": None}
+        ru = resource.getrusage(resource.RUSAGE_SELF)
+        return {"cpu_s": ru.ru_utime + ru.ru_stime, "rss_mb": None, "peak_rss_mb": ru.ru_maxrss / 1024.0}
+
+
+async def drive(rate: float, duration: float, coins: list, send) -> tuple:
+    # -> ([(latency_s, outcome)], wall seconds)
+    async def timed(coin):
+        start = time.perf_counter()
+        try:
+            outcome = await send(coin)
+        except Exception as e:
+            outcome = f"error:{type(e).__name__}"
+        return time.perf_counter() - start, outcome
+
+    n = int(rate * duration)
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    tasks = []
+    for i in range(n):
+        delay = t0 + i / rate - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(timed(coins[i % len(coins)])))
+    samples = await asyncio.gather(*tasks)
+    return samples, loop.time() - t0
+
+
+def summarize(samples: list, wall: float, ok_outcomes: tuple) -> dict:
+    outcomes = {}
+    for _, outcome in samples:
+        outcomes[str(outcome)] = outcomes.get(str(outcome), 0) + 1
+    ok = [lat for lat, outcome in samples if outcome in ok_outcomes]
+    lat_ms = sorted(lat * 1000.0 for lat in ok)
+    return {
+        "requests": len(samples),
+        "ok": len(ok),
+        "outcomes": outcomes,
+        "wall_s": round(wall, 3),
+        # successful responses per second, over the time until the last one returned
+        "throughput_rps": round(len(ok) / wall, 2) if wall > 0 else None,
+        "latency_ms": {
+            "p50": round(percentile(lat_ms, 0.50), 2),
+            "p95": round(percentile(lat_ms, 0.95), 2),
+            "p99": round(percentile(lat_ms, 0.99), 2),
+            "max": round(lat_ms[-1], 2) if lat_ms else 0.0,
+            "mean": round(sum(lat_ms) / len(lat_ms), 2) if lat_ms else 0.0,
+        },
+    }
+
+
+async def run_orchestrator(args, coins: list) -> dict:
+    import orchestrator
+
+    client, _ = install_fakes(orchestrator, args)
+
+    async def send(coin):
+        result = await orchestrator.score_coin(coin)
+        return "ok" if not result["excluded_components"] else "partial"
+
+    before = proc_stats()
+    samples, wall = await drive(args.rate, args.duration, coins, send)
+    after = proc_stats()
+
+    report = summarize(samples, wall, ("ok", "partial"))
+    report["cpu_s"] = round(after["cpu_s"] - before["cpu_s"], 3)
+    report["rss_mb"] = after["rss_mb"]
+    report["peak_rss_mb"] = after["peak_rss_mb"]
+    # add_message round trips, the per-call cost that AGENT_BATCH_SIZE amortizes
+    report["agent_calls"] = client.messages
+    report["agent_calls_per_scoring"] = round(client.messages / len(samples), 2) if samples else None
+    return report
+
+
+async def http_get(port: int, path: str) -> int:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def wait_for_port(port: int, timeout: float):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"server did not listen on port {port} within {timeout}s")
+
+
+async def run_server(args, coins: list) -> dict:
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "serve_fakes.py"), "--port", str(args.port)] + fake_argv(args),
+        cwd=ROOT, env=os.environ.copy(),
+    )
+    try:
+        await wait_for_port(args.port, 20)
+
+        async def send(coin):
+            return await http_get(args.port, f"/score?coin={coin}")
+
+        before = proc_stats(str(proc.pid))
+        samples, wall = await drive(args.rate, args.duration, coins, send)
+        after = proc_stats(str(proc.pid))
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+    report = summarize(samples, wall, (200,))
+    if before["cpu_s"] is not None and after["cpu_s"] is not None:
+        report["cpu_s"] = round(after["cpu_s"] - before["cpu_s"], 3)
+    else:
+        report["cpu_s"] = None
+    report["rss_mb"] = after["rss_mb"]
+    report["peak_rss_mb"] = after["peak_rss_mb"]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the scoring path against fake upstreams.")
+    parser.add_argument("--target", choices=("orchestrator", "server"), default="orchestrator")
+    parser.add_argument("--rate", type=float, default=20.0, help="requests per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--coins", type=int, default=1000, help="size of the coin universe requests draw from")
+    parser.add_argument("--cache", action="store_true", help="keep the context/agent caches and verdict reuse on")
+    parser.add_argument("--port", type=int, default=18080, help="port for --target server")
+    parser.add_argument("--out", help="also write the JSON report here")
+    add_fake_args(parser)
+    args = parser.parse_args()
+
+    # measure the pipeline, not the caches, unless asked; never write verdict or history files
+    if not args.cache:
+        os.environ["CONTEXT_CACHE_MAX_BYTES"] = "0"
+        os.environ["AGENT_CACHE_MAX_ENTRIES"] = "0"
+        os.environ["RESCORE_MAX_COINS"] = "0"
+    os.environ["AGENT_CACHE_DIR"] = ""
+    os.environ["HISTORY_DB"] = ""
+
+    rng = random.Random(args.seed)
+    coins = [f"coin-{rng.randrange(args.coins)}" for _ in range(max(1, int(args.rate * args.duration)))]
+
+    runner = run_orchestrator if args.target == "orchestrator" else run_server
+    report = {
+        "target": args.target,
+        "offered_rps": args.rate,
+        "commit": git_commit(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("out", "port")},
+        **asyncio.run(runner(args, coins)),
+    }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import argparse
+import os
+import sys
+
+# python backboard/bench/serve_fakes.py --port 18080 [fake options]
+# Runs server.py's app with the orchestrator wired to bench/fakes.py.
+# Started by loadtest.py --target server.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(HERE)))  # repo root, for server.py
+sys.path.insert(0, os.path.dirname(HERE))                   # backboard/
+sys.path.insert(0, HERE)
+
+from fakes import add_fake_args, install_fakes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring server backed by fake upstreams.")
+    parser.add_argument("--port", type=int, default=18080)
+    add_fake_args(parser)
+    args = parser.parse_args()
+
+    import orchestrator
+    import server
+    import uvicorn
+
+    install_fakes(orchestrator, args)
+    uvicorn.run(server.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import time
+from collections import deque
+
+# Record/replay of everything a scoring reads from the network.
+#
+# CaptureWriter appends one JSON line per upstream answer to a gzip file:
+# each context as get_context returned it (the JSON text) and each raw agent
+# reply before any parsing, with the coin, component, prompt hash and how
+# long the call took. A call that failed is recorded with its error instead
+# and fails again on replay. ReplayArchive serves those answers back in place of
+# the upstreams, so a run can be re-scored offline through the same JSON
+# extraction, local scorers and aggregation, as often as needed.
+#
+# Lookups in replay: a context by coin (in recorded order, the last one
+# repeating); an agent reply by exact prompt, else the coin's last reply from
+# that component, else the coin's entry of a recorded batched reply.
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:32]
+
+
+class CaptureWriter:
+    def __init__(self, path: str, meta: dict = None):
+        self.path = path
+        self.records = 0
+        self._f = gzip.open(path, "wt", encoding="utf-8")
+        self._write({"kind": "meta", "started": time.time(), **(meta or {})})
+
+    def _write(self, record: dict):
+        self._f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def context(self, coin: str, sections, coin_id: str, text: str, elapsed_s: float, error: str = None):
+        self.records += 1
+        record = {"kind": "context", "coin": coin, "sections": sections, "coin_id": coin_id,
+                  "elapsed_s": round(elapsed_s, 4), "raw": text}
+        if error is not None:
+            record["error"] = error
+        self._write(record)
+
+    def agent(self, component: str, coin: str, prompt: str, raw: str, elapsed_s: float, coins: list = None,
+              error: str = None):
+        # coins: the coin keys of a batched prompt
+        self.records += 1
+        record = {"kind": "agent", "component": component, "coin": coin, "prompt": prompt_hash(prompt),
+                  "elapsed_s": round(elapsed_s, 4), "raw": raw}
+        if coins:
+            record["coins"] = coins
+        if error is not None:
+            record["error"] = error
+        self._write(record)
+
+    def close(self):
+        self._f.close()
+
+    def stats(self) -> dict:
+        return {"records": self.records}
+
+
+class ReplayMiss(LookupError):
+    pass
+
+
+class RecordedFailure(RuntimeError):
+    pass
+
+
+class ReplayArchive:
+    # speed: 0 answers at once, 1 waits as long as the recorded call took
+    def __init__(self, path: str, speed: float = 0.0):
+        self.path = path
+        self.speed = speed
+        self.meta = {}
+        self.contexts = {}      # coin -> deque of records
+        self.context_ids = {}   # resolved coin id -> coin, for refreshes asked by id
+        self.by_prompt = {}     # (component, prompt hash) -> deque of records
+        self.by_coin = {}       # (component, coin) -> last single-coin record
+        self.batched = {}       # (component, coin) -> last batched record naming the coin
+        self.coins = []         # in first-seen order
+        self.served = 0
+        self.misses = 0
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    self._index(json.loads(line))
+
+    def _index(self, rec: dict):
+        kind = rec.get("kind")
+        if kind == "meta":
+            self.meta = rec
+        elif kind == "context":
+            if rec["coin"] not in self.contexts:
+                self.coins.append(rec["coin"])
+            self.contexts.setdefault(rec["coin"], deque()).append(rec)
+            if rec.get("coin_id"):
+                self.context_ids.setdefault(rec["coin_id"], rec["coin"])
+        elif kind == "agent":
+            self.by_prompt.setdefault((rec["component"], rec["prompt"]), deque()).append(rec)
+            # a failed call is only replayed for its exact prompt, never as a coin's fallback reply
+            if rec.get("error") is None:
+                if rec.get("coins"):
+                    for coin in rec["coins"]:
+                        self.batched[(rec["component"], coin)] = rec
+                else:
+                    self.by_coin[(rec["component"], rec["coin"])] = rec
+
+    @staticmethod
+    def _next(records: deque) -> dict:
+        # in recorded order; the last one keeps answering
+        return records.popleft() if len(records) > 1 else records[0]
+
+    async def _wait(self, rec: dict):
+        if self.speed > 0:
+            await asyncio.sleep(rec.get("elapsed_s", 0.0) * self.speed)
+        if rec.get("error") is not None:
+            self.served += 1
+            raise RecordedFailure(rec["error"])
+
+    async def context(self, coin: str) -> tuple:
+        # -> (coin id, context JSON text)
+        records = self.contexts.get(coin) or self.contexts.get(self.context_ids.get(coin))
+        if not records:
+            self.misses += 1
+            raise ReplayMiss(f"no recorded context for coin='{coin}' in {self.path}")
+        rec = self._next(records)
+        await self._wait(rec)
+        self.served += 1
+        return rec["coin_id"], rec["raw"]
+
+    async def agent(self, component: str, coin: str, prompt: str) -> str:
+        # -> the raw reply text
+        records = self.by_prompt.get((component, prompt_hash(prompt)))
+        if records:
+            rec = self._next(records)
+            raw = rec["raw"]
+        elif (component, coin) in self.by_coin:
+            rec = self.by_coin[(component, coin)]
+            raw = rec["raw"]
+        elif (component, coin) in self.batched:
+            # a single-coin ask for a coin that was only recorded inside a batch
+            rec = self.batched[(component, coin)]
+            raw = self._batch_entry(rec, coin)
+        else:
+            self.misses += 1
+            raise ReplayMiss(f"no recorded {component} reply for coin='{coin}' in {self.path}")
+        await self._wait(rec)
+        self.served += 1
+        return raw
+
+    @staticmethod
+    def _batch_entry(rec: dict, coin: str) -> str:
+        text = rec["raw"]
+        i, j = text.find("{"), text.rfind("}")
+        try:
+            entry = json.loads(text[i:j + 1]).get(coin)
+        except (ValueError, AttributeError):
+            entry = None
+        if entry is None:
+            raise ReplayMiss(f"recorded batch reply has no entry for coin='{coin}'")
+        return json.dumps(entry, ensure_ascii=False)
+
+    def stats(self) -> dict:
+        return {"coins": len(self.coins), "served": self.served, "misses": self.misses}
@@ -0,0 +1,162 @@
+import asyncio
+import sys
+import time
+from collections import OrderedDict
+
+from models import SECTIONS, CoinContext
+
+# In-process cache of contextForAI snapshots, keyed by resolved CoinGecko id.
+#
+# Each section has its own TTL: prices move by the minute, repo stats and the
+# contract deployer barely move in a day. When a section expires we keep
+# serving the stale copy for up to `stale_s` more seconds while one background
+# task refetches just the expired sections; past that window the caller waits
+# for the refetch. Entries are evicted LRU once the serialized size of all
+# cached contexts exceeds `max_bytes`.
+#
+# A fetched context is parsed into a CoinContext before it is stored (a
+# malformed one raises ContextError and is not cached); a hit hands out the
+# same immutable instance, so nothing is parsed or copied per request.
+
+
+def normalize_coin(coin_name: str) -> str:
+    return (coin_name or "").strip().lower()
+
+
+class _Entry:
+    __slots__ = ("coin_id", "context", "fetched_at", "size", "aliases")
+
+    def __init__(self, coin_id: str):
+        self.coin_id = coin_id
+        self.context = None
+        self.fetched_at = {}
+        self.size = 0
+        self.aliases = set()
+
+    def merge(self, parsed: CoinContext, sections: list, now: float):
+        # sections: the ones the fetch returned; the others keep their old copy
+        self.context = parsed if self.context is None else self.context.merged(parsed, sections)
+        for k in sections:
+            self.fetched_at[k] = now
+        self.size = self.context.nbytes
+
+    def ages(self, now: float) -> dict:
+        return {k: now - t for k, t in self.fetched_at.items()}
+
+
+class ContextCache:
+    def __init__(self, fetch, ttls: dict, max_bytes: int, stale_s: float):
+        # fetch(coin_name, sections) -> (coin_id, ctx); sections=None means all
+        self.fetch = fetch
+        self.ttls = ttls
+        self.max_bytes = max_bytes
+        self.stale_s = stale_s
+        self.entries = OrderedDict()
+        self.aliases = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self._refreshing = set()
+        self._tasks = set()
+
+    def _expired(self, entry: _Entry, now: float) -> list:
+        ages = entry.ages(now)
+        return [s for s in SECTIONS if ages.get(s, float("inf")) > self.ttls.get(s, 0)]
+
+    def _store(self, coin_name: str, coin_id: str, ctx: dict, now: float) -> _Entry:
+        parsed = CoinContext.parse(ctx)
+        entry = self.entries.get(coin_id)
+        if entry is None:
+            entry = self.entries[coin_id] = _Entry(coin_id)
+        else:
+            self.total_bytes -= entry.size
+        entry.merge(parsed, [k for k in ctx if k in SECTIONS], now)
+        self.total_bytes += entry.size
+
+        for alias in (normalize_coin(coin_name), normalize_coin(coin_id)):
+            self.aliases[alias] = coin_id
+            entry.aliases.add(alias)
+
+        self.entries.move_to_end(coin_id)
+        self._evict()
+        return entry
+
+    def _evict(self):
+        # always keep the newest entry, even if it alone exceeds the cap
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            _, old = self.entries.popitem(last=False)
+            self.total_bytes -= old.size
+            for alias in old.aliases:
+                if self.aliases.get(alias) == old.coin_id:
+                    del self.aliases[alias]
+
+    async def _refresh(self, coin_name: str, coin_id: str, sections: list):
+        try:
+            _, ctx = await self.fetch(coin_id, sections)
+            self._store(coin_name, coin_id, ctx, time.time())
+        except Exception as e:
+            print(f"[context cache] background refresh failed for {coin_id}: {e}", file=sys.stderr)
+        finally:
+            self._refreshing.discard(coin_id)
+
+    def servable(self, coin_name: str) -> bool:
+        # True if get() would answer without waiting on a fetch (a hit or a stale hit)
+        coin_id = self.aliases.get(normalize_coin(coin_name))
+        entry = self.entries.get(coin_id) if coin_id else None
+        if entry is None:
+            return False
+        ages = entry.ages(time.time())
+        return all(ages.get(s, float("inf")) <= self.ttls.get(s, 0) + self.stale_s for s in SECTIONS)
+
+    async def get(self, coin_name: str) -> tuple:
+        now = time.time()
+        coin_id = self.aliases.get(normalize_coin(coin_name))
+        entry = self.entries.get(coin_id) if coin_id else None
+
+        if entry is None:
+            self.misses += 1
+            coin_id, ctx = await self.fetch(coin_name, None)
+            entry = self._store(coin_name, coin_id, ctx, time.time())
+            status = "miss"
+        else:
+            self.entries.move_to_end(coin_id)
+            expired = self._expired(entry, now)
+            ages = entry.ages(now)
+            if not expired:
+                self.hits += 1
+                status = "hit"
+            elif all(ages.get(s, float("inf")) <= self.ttls.get(s, 0) + self.stale_s for s in expired):
+                self.stale_hits += 1
+                status = "stale"
+                if coin_id not in self._refreshing:
+                    self._refreshing.add(coin_id)
+                    task = asyncio.create_task(self._refresh(coin_name, coin_id, expired))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+            else:
+                # too old to serve: refetch the expired sections inline
+                self.misses += 1
+                _, ctx = await self.fetch(coin_id, expired)
+                entry = self._store(coin_name, coin_id, ctx, time.time())
+                status = "refresh"
+
+        ages = entry.ages(time.time())
+        info = {
+            "status": status,
+            "coin_id": entry.coin_id,
+            "age_s": round(max(ages.values(), default=0.0), 2),
+            "section_age_s": {k: round(v, 2) for k, v in ages.items()},
+        }
+        return entry.context, info
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshing": len(self._refreshing),
+        }
@@ -0,0 +1,165 @@
+import asyncio
+import itertools
+import json
+import sys
+
+# Pool of long-lived `node context_worker.js` processes. Each worker keeps its
+# ESM modules and API clients warm and serves many requests over
+# newline-delimited JSON, so a context fetch only costs the upstream API time.
+
+WORKER_SCRIPT = "backboard/scripts/context_worker.js"
+
+# one context is a few KB, but don't let a large one trip the 64 KB default
+LINE_LIMIT = 16 * 1024 * 1024
+
+_request_ids = itertools.count(1)
+
+
+class ContextWorker:
+    def __init__(self, index: int, script: str = WORKER_SCRIPT):
+        self.index = index
+        self.script = script
+        self.proc = None
+        self.pending = {}
+        self.in_flight = 0
+        self.restarts = 0
+        self._start_lock = asyncio.Lock()
+        # read loops still running: the current process's, plus a crashed one's
+        # that is failing its requests; asyncio itself only keeps weak references
+        self._readers = set()
+
+    @property
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+    async def ensure_started(self):
+        async with self._start_lock:
+            if self.alive:
+                return
+            if self.proc is not None:
+                self.restarts += 1
+
+            proc = await asyncio.create_subprocess_exec(
+                "node", self.script,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                limit=LINE_LIMIT,
+            )
+            # pending futures belong to one process: a crashed worker fails
+            # only its own requests, never those sent to its replacement
+            self.proc = proc
+            self.pending = {}
+            reader = asyncio.create_task(self._read_loop(proc, self.pending))
+            self._readers.add(reader)
+            reader.add_done_callback(self._reader_done)
+
+    def _reader_done(self, task: asyncio.Task):
+        self._readers.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[context worker {self.index}] read loop failed: {task.exception()!r}", file=sys.stderr)
+
+    async def _read_loop(self, proc, pending: dict):
+        while True:
+            try:
+                line = await proc.stdout.readline()
+            except Exception:
+                line = b""
+            if not line:
+                break
+
+            try:
+                msg = json.loads(line)
+            except Exception:
+                continue
+
+            fut = pending.pop(msg.get("id"), None)
+            if fut is None or fut.done():
+                continue
+            fut.set_result(msg)
+
+        await proc.wait()
+        for fut in pending.values():
+            if not fut.done():
+                fut.set_exception(RuntimeError(
+                    f"context worker {self.index} exited (exit={proc.returncode})"
+                ))
+        pending.clear()
+
+    async def request(self, coin_name: str, timeout: float, sections=None) -> tuple:
+        # counted before the first await so the pool sees the load immediately
+        self.in_flight += 1
+        pending = None
+        req_id = next(_request_ids)
+        try:
+            await self.ensure_started()
+
+            fut = asyncio.get_running_loop().create_future()
+            pending = self.pending
+            pending[req_id] = fut
+
+            req = {"id": req_id, "coin": coin_name}
+            if sections is not None:
+                req["sections"] = list(sections)
+            line = json.dumps(req) + "\n"
+            self.proc.stdin.write(line.encode("utf-8"))
+            await self.proc.stdin.drain()
+
+            try:
+                msg = await asyncio.wait_for(fut, timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(
+                    f"get_context timed out for coin='{coin_name}' after {timeout}s"
+                ) from None
+        finally:
+            self.in_flight -= 1
+            if pending is not None:
+                pending.pop(req_id, None)
+
+        if not msg.get("ok"):
+            raise RuntimeError(
+                f"get_context.js failed for coin='{coin_name}'. "
+                f"error:\n{msg.get('error', '')}"
+            )
+        return msg.get("coin_id") or coin_name, msg["context"]
+
+    async def close(self):
+        proc = self.proc
+        if proc is not None and proc.returncode is None:
+            proc.stdin.close()
+            try:
+                await asyncio.wait_for(proc.wait(), 5)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+        # the process is gone, so its read loop ends at EOF; give it a moment to
+        # fail what was still pending, then stop whatever is left
+        readers = list(self._readers)
+        if readers:
+            await asyncio.wait(readers, timeout=1.0)
+            for reader in readers:
+                reader.cancel()
+            await asyncio.gather(*readers, return_exceptions=True)
+
+
+class ContextWorkerPool:
+    def __init__(self, size: int, timeout: float, script: str = WORKER_SCRIPT):
+        if size < 1:
+            raise ValueError(f"context pool size must be >= 1, got {size}")
+        self.timeout = timeout
+        self.workers = [ContextWorker(i, script) for i in range(size)]
+
+    async def get_context(self, coin_name: str, sections=None) -> tuple:
+        # least-loaded worker; idle ones win so bursts fan out across the pool
+        worker = min(self.workers, key=lambda w: w.in_flight)
+        return await worker.request(coin_name, self.timeout, sections)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.workers),
+            "alive": sum(1 for w in self.workers if w.alive),
+            "in_flight": sum(w.in_flight for w in self.workers),
+            "restarts": sum(w.restarts for w in self.workers),
+        }
+
+    async def close(self):
+        await asyncio.gather(*(w.close() for w in self.workers))
@@ -2,6 +2,8 @@ import asyncio
 import os
 from backboard import BackboardClient
 
+from agent_cache import AgentCache, DEFAULT_DIR as AGENT_CACHE_DEFAULT_DIR
+
 async def main():
     api_key = os.getenv("BACKBOARD_API_KEY", "").strip()
     client = BackboardClient(api_key=api_key)
@@ -82,6 +84,10 @@ async def main():
     print("Dev Velocity agent assistant_id:", dev_agent.assistant_id)
     print("On-chain agent assistant_id:", onchain_agent.assistant_id)
 
+    # verdicts cached for the previous assistants no longer apply
+    AgentCache(disk_dir=os.getenv("AGENT_CACHE_DIR", AGENT_CACHE_DEFAULT_DIR).strip()).invalidate()
+    print("Agent verdict cache cleared.")
+
 
 
 if __name__ == "__main__":
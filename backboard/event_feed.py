@@ -0,0 +1,64 @@
+import asyncio
+
+# One running producer whose events any number of followers read.
+#
+# produce(publish) runs as a task as soon as the feed is made; every event
+# it publishes is kept, so a follower that joins late first gets everything
+# published so far, then the rest as it comes, then the producer's outcome
+# (its exception is raised to every follower). When the last follower leaves
+# before the end the producer is cancelled, unless the feed was pinned by a
+# caller that awaits result() and wants the work finished either way.
+
+
+class EventFeed:
+    def __init__(self, produce):
+        self.events = []
+        self.followers = 0
+        self.pinned = False
+        self.abandoned = False
+        self._update = asyncio.get_running_loop().create_future()
+        self.task = asyncio.ensure_future(produce(self.publish))
+        self.task.add_done_callback(self._done)
+
+    def publish(self, event):
+        self.events.append(event)
+        self._wake()
+
+    def _wake(self):
+        fut, self._update = self._update, asyncio.get_running_loop().create_future()
+        if not fut.done():
+            fut.set_result(None)
+
+    def _done(self, task: asyncio.Task):
+        # retrieved here, so a failure nobody followed isn't reported as never retrieved
+        if not task.cancelled():
+            task.exception()
+        self._wake()
+
+    async def result(self):
+        # the producer's return value; this caller going away doesn't cancel it
+        self.pinned = True
+        return await asyncio.shield(self.task)
+
+    async def follow(self):
+        self.followers += 1
+        i = 0
+        try:
+            while True:
+                if i < len(self.events):
+                    i += 1
+                    yield self.events[i - 1]
+                elif self.task.done():
+                    if self.task.cancelled():
+                        # every follower left (or the loop is shutting down) before this one started
+                        raise RuntimeError("the shared producer was cancelled")
+                    self.task.result()
+                    return
+                else:
+                    # wait() rather than await: a follower leaving must not cancel the shared future
+                    await asyncio.wait({self._update})
+        finally:
+            self.followers -= 1
+            if self.followers == 0 and not self.pinned and not self.task.done():
+                self.abandoned = True
+                self.task.cancel()
@@ -0,0 +1,199 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# Local time series of scoring results, one SQLite file.
+#
+# Rows are clustered on (coin, ts) (WITHOUT ROWID), so a range query for one
+# coin is a single index range scan however many coins share the file. Old rows
+# are compacted in place: past `raw_keep_s` they are averaged into hourly rows,
+# past `hourly_keep_s` into daily ones. `resolution` says which (0 = one
+# scoring, else the bucket width in seconds) and `samples` how many scorings a
+# row stands for. Calls block; the orchestrator runs them in a thread.
+
+DEFAULT_PATH = "backboard/.cache/history.sqlite3"
+
+SUBSCORE_COLUMNS = {
+    "market_integrity":  "market",
+    "dev_velocity":      "dev",
+    "on_chain_security": "onchain",
+    "social_sentiment":  "social",
+}
+CONFIDENCE_COLUMNS = {c: col + "_conf" for c, col in SUBSCORE_COLUMNS.items()}
+NUMERIC_COLUMNS = (("master", "confidence", "coverage") + tuple(SUBSCORE_COLUMNS.values())
+                   + tuple(CONFIDENCE_COLUMNS.values()))
+
+HOUR = 3600
+DAY = 86400
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS scores (
+    coin       TEXT    NOT NULL,
+    ts         REAL    NOT NULL,
+    {", ".join(f"{c} REAL" for c in NUMERIC_COLUMNS)},
+    flags      TEXT    NOT NULL DEFAULT '[]',
+    tier       TEXT,
+    name       TEXT,
+    resolution INTEGER NOT NULL DEFAULT 0,
+    samples    INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (coin, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS scores_resolution_ts ON scores (resolution, ts);
+"""
+
+
+class HistoryStore:
+    def __init__(self, path: str = DEFAULT_PATH, raw_keep_s: float = 7 * DAY, hourly_keep_s: float = 90 * DAY,
+                 compact_every_s: float = HOUR):
+        self.path = path
+        self.raw_keep_s = raw_keep_s
+        self.hourly_keep_s = hourly_keep_s
+        self.compact_every_s = compact_every_s
+        self.last_compacted = 0.0
+        self.writes = 0
+        self._local = threading.local()
+        self._compact_lock = threading.Lock()
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        # files from before a column existed get it added, empty
+        have = {row[1] for row in conn.execute("PRAGMA table_info(scores)")}
+        for column in NUMERIC_COLUMNS + ("name",):
+            if column not in have:
+                conn.execute(f"ALTER TABLE scores ADD COLUMN {column} {'TEXT' if column == 'name' else 'REAL'}")
+
+    def _conn(self) -> sqlite3.Connection:
+        # one connection per thread; WAL lets readers run while a write commits
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def record(self, coin: str, result: dict, ts: float = None):
+        subscores = result.get("subscores") or {}
+        confidences = result.get("confidences") or {}
+        row = {
+            "coin": coin,
+            "ts": time.time() if ts is None else ts,
+            "master": result.get("master_score"),
+            "confidence": result.get("confidence"),
+            "coverage": result.get("coverage"),
+            "flags": json.dumps(result.get("flags") or [], ensure_ascii=False),
+            "tier": result.get("tier"),
+            "name": result.get("coin"),
+        }
+        for component, column in SUBSCORE_COLUMNS.items():
+            row[column] = subscores.get(component)
+            row[CONFIDENCE_COLUMNS[component]] = confidences.get(component)
+
+        columns = ", ".join(row)
+        params = ", ".join(":" + k for k in row)
+        self._conn().execute(f"INSERT OR REPLACE INTO scores ({columns}) VALUES ({params})", row)
+        self.writes += 1
+
+        if row["ts"] - self.last_compacted >= self.compact_every_s:
+            self.compact(now=row["ts"])
+
+    def query(self, coin: str, start: float = None, end: float = None, limit: int = 10000) -> list:
+        start = float("-inf") if start is None else start
+        end = float("inf") if end is None else end
+        cur = self._conn().execute(
+            f"SELECT ts, {', '.join(NUMERIC_COLUMNS)}, flags, tier, resolution, samples "
+            f"FROM scores WHERE coin = ? AND ts >= ? AND ts <= ? ORDER BY ts LIMIT ?",
+            (coin, start, end, limit),
+        )
+        return [self._point(dict(zip(("ts",) + NUMERIC_COLUMNS + ("flags", "tier", "resolution", "samples"), r)))
+                for r in cur]
+
+    @staticmethod
+    def _point(r: dict) -> dict:
+        return {
+            "ts": r["ts"],
+            "master_score": r["master"],
+            "confidence": r["confidence"],
+            "coverage": r["coverage"],
+            "subscores": {c: r[col] for c, col in SUBSCORE_COLUMNS.items()},
+            "confidences": {c: r[col] for c, col in CONFIDENCE_COLUMNS.items()},
+            "flags": json.loads(r["flags"]),
+            "tier": r["tier"],
+            "resolution_s": r["resolution"],
+            "samples": r["samples"],
+        }
+
+    def latest(self, tier: str = None) -> list:
+        # -> [(coin, name, point)], the newest row of every coin (of one scoring
+        # tier if given; rows from before tiers were recorded count as "full");
+        # SQLite fills bare columns from the row that max() picked
+        where = "WHERE COALESCE(tier, 'full') = ? " if tier is not None else ""
+        cur = self._conn().execute(
+            f"SELECT coin, name, MAX(ts), {', '.join(NUMERIC_COLUMNS)}, flags, tier, resolution, samples "
+            f"FROM scores {where}GROUP BY coin",
+            (tier,) if tier is not None else (),
+        )
+        keys = ("ts",) + NUMERIC_COLUMNS + ("flags", "tier", "resolution", "samples")
+        return [(coin, name, self._point(dict(zip(keys, rest)))) for coin, name, *rest in cur]
+
+    def _rollup(self, conn: sqlite3.Connection, bucket_s: int, cutoff: float) -> int:
+        # averages (weighted by samples, ignoring NULL subscores) per coin and
+        # bucket; flags, tier and name come from the latest row of the bucket, which
+        # is what SQLite gives bare columns next to a single max()
+        averages = ", ".join(
+            f"SUM({c} * samples) / SUM(CASE WHEN {c} IS NOT NULL THEN samples END)" for c in NUMERIC_COLUMNS
+        )
+        rows = conn.execute(
+            f"SELECT coin, CAST(ts / :b AS INTEGER) * :b AS bucket, {averages}, flags, tier, name, SUM(samples), MAX(ts) "
+            f"FROM scores WHERE resolution < :b AND ts < :cutoff GROUP BY coin, bucket",
+            {"b": bucket_s, "cutoff": cutoff},
+        ).fetchall()
+        if not rows:
+            return 0
+        conn.execute("DELETE FROM scores WHERE resolution < ? AND ts < ?", (bucket_s, cutoff))
+        placeholders = ", ".join("?" * (len(NUMERIC_COLUMNS) + 7))
+        conn.executemany(
+            f"INSERT OR REPLACE INTO scores (coin, ts, {', '.join(NUMERIC_COLUMNS)}, flags, tier, name, samples, resolution) "
+            f"VALUES ({placeholders})",
+            [tuple(r[:-1]) + (bucket_s,) for r in rows],
+        )
+        return len(rows)
+
+    def compact(self, now: float = None) -> dict:
+        # -> rows written per resolution; safe to run any time, it only touches old rows
+        now = time.time() if now is None else now
+        if not self._compact_lock.acquire(blocking=False):
+            return {}
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # hourly cutoff is aligned so a bucket is never split between raw and compacted rows
+                hourly = self._rollup(conn, HOUR, (now - self.raw_keep_s) // HOUR * HOUR)
+                daily = self._rollup(conn, DAY, (now - self.hourly_keep_s) // DAY * DAY)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self.last_compacted = now
+            return {"hourly": hourly, "daily": daily}
+        finally:
+            self._compact_lock.release()
+
+    def stats(self) -> dict:
+        return {"writes": self.writes, "last_compacted": self.last_compacted}
+
+
+if __name__ == "__main__":
+    # python backboard/history.py compact   -- roll up old rows now
+    path = os.getenv("HISTORY_DB", DEFAULT_PATH).strip() or DEFAULT_PATH
+    if sys.argv[1:] == ["compact"]:
+        print(json.dumps(HistoryStore(path).compact()))
+    else:
+        print("usage: python backboard/history.py compact", file=sys.stderr)
+        sys.exit(2)
@@ -0,0 +1,49 @@
+# Incremental scanner for the first top-level JSON object in streamed text.
+#
+# Agents answer with a JSON object, often wrapped in a code fence or followed
+# by a sentence or two. Feeding the stream chunk by chunk lets the caller stop
+# reading as soon as the object's closing brace arrives instead of waiting for
+# (and paying for) the rest of the completion.
+
+
+class JsonObjectScanner:
+    __slots__ = ("started", "depth", "in_string", "escape", "done")
+
+    def __init__(self):
+        self.started = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.done = False
+
+    def feed(self, chunk: str):
+        # -> offset in `chunk` just past the closing brace, or None if not closed yet
+        if self.done:
+            return 0
+        for i, ch in enumerate(chunk):
+            if not self.started:
+                # anything before the first "{" (prose, ```json) is skipped
+                if ch == "{":
+                    self.started = True
+                    self.depth = 1
+                continue
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                continue
+
+            if ch == '"':
+                self.in_string = True
+            elif ch == "{" or ch == "[":
+                self.depth += 1
+            elif ch == "}" or ch == "]":
+                self.depth -= 1
+                if self.depth == 0:
+                    self.done = True
+                    return i + 1
+        return None
@@ -0,0 +1,209 @@
+import bisect
+
+import numpy as np
+
+# Latest subscores of every scored coin, as columns, for reweighting and ranking.
+#
+# Each coin is one row of `subscores` / `confidences` (NaN for a component
+# that was excluded). reaggregate() recomputes master score, confidence and
+# coverage for all rows under any weights in a few array operations; missing
+# components drop out of both numerator and coverage, as in
+# orchestrator.aggregate(). For the named profiles a sorted (score, coin)
+# list per profile is kept up to date on every upsert, so top/bottom K is a
+# slice. Past its capacity the caller evicts the least recently updated coin.
+
+
+class Scoreboard:
+    def __init__(self, components: tuple, profiles: dict, capacity: int = 1024):
+        self.components = tuple(components)
+        self.profiles = {name: self._weights(w) for name, w in profiles.items()}
+        self._profile_lists = {name: w.tolist() for name, w in self.profiles.items()}
+        self.coins = []
+        self.rows = {}          # coin -> row index
+        self.names = []
+        self.updated_at = np.zeros(capacity)
+        self.subscores = np.full((capacity, len(self.components)), np.nan)
+        self.confidences = np.full((capacity, len(self.components)), np.nan)
+        self.index = {name: [] for name in self.profiles}   # profile -> sorted [(master, coin)]
+        self.current = {name: {} for name in self.profiles}  # profile -> {coin: master}
+
+    def _weights(self, weights: dict) -> np.ndarray:
+        return np.array([float(weights.get(c, 0.0)) for c in self.components])
+
+    def __len__(self) -> int:
+        return len(self.coins)
+
+    def _row(self, coin: str) -> int:
+        row = self.rows.get(coin)
+        if row is not None:
+            return row
+        row = len(self.coins)
+        if row == len(self.subscores):
+            grow = np.full(self.subscores.shape, np.nan)
+            self.subscores = np.vstack([self.subscores, grow])
+            self.confidences = np.vstack([self.confidences, grow.copy()])
+            self.updated_at = np.concatenate([self.updated_at, np.zeros(len(grow))])
+        self.coins.append(coin)
+        self.names.append(coin)
+        self.updated_at[row] = 0.0
+        self.rows[coin] = row
+        return row
+
+    def _store(self, coin: str, subscores: dict, confidences: dict, ts: float, name: str):
+        # -> (subscores, confidences) lists, or None if the stored row is newer
+        row = self._row(coin)
+        if ts < self.updated_at[row]:
+            return None
+        confidences = confidences or {}
+        subs = [subscores.get(c) for c in self.components]
+        confs = [confidences.get(c) for c in self.components]
+        self.subscores[row] = [np.nan if s is None else float(s) for s in subs]
+        self.confidences[row] = [np.nan if c is None else float(c) for c in confs]
+        self.updated_at[row] = ts
+        self.names[row] = name or self.names[row]
+        return subs, confs
+
+    def upsert(self, coin: str, subscores: dict, confidences: dict, ts: float, name: str = None):
+        stored = self._store(coin, subscores, confidences, ts, name)
+        if stored is None:
+            return
+        subs, confs = stored
+
+        # one row: plain floats beat numpy's per-call overhead
+        for profile, index in self.index.items():
+            self._unindex(profile, coin)
+            value = self._scalar(subs, confs, self._profile_lists[profile])[0]
+            if value is not None:
+                bisect.insort(index, (value, coin))
+                self.current[profile][coin] = value
+
+    def load(self, entries):
+        # bulk upsert of (coin, subscores, confidences, ts, name): the indexes
+        # are rebuilt with one vectorized pass and one sort per profile
+        for coin, subscores, confidences, ts, name in entries:
+            self._store(coin, subscores, confidences, ts, name)
+        masters, _, _ = self._aggregate_rows(0, len(self.coins), *self.profiles.values())
+        for profile, master in zip(self.profiles, masters):
+            valid = np.flatnonzero(~np.isnan(master))
+            current = {self.coins[i]: float(master[i]) for i in valid.tolist()}
+            self.current[profile] = current
+            self.index[profile] = sorted((m, coin) for coin, m in current.items())
+
+    @staticmethod
+    def _scalar(subs: list, confs: list, weights: list) -> tuple:
+        # -> (master, confidence, coverage) of one row; master None if nothing is covered
+        coverage = master = confidence = 0.0
+        for s, c, w in zip(subs, confs, weights):
+            if s is None:
+                continue
+            coverage += w
+            master += w * s
+            confidence += w * (0.5 if c is None else c)
+        if coverage <= 0:
+            return None, None, coverage
+        return master / coverage, confidence / coverage, coverage
+
+    def _row_values(self, row: int) -> tuple:
+        subs = [None if np.isnan(v) else v for v in self.subscores[row].tolist()]
+        confs = [None if np.isnan(v) else v for v in self.confidences[row].tolist()]
+        return subs, confs
+
+    def _unindex(self, profile: str, coin: str):
+        old = self.current[profile].pop(coin, None)
+        if old is not None:
+            index = self.index[profile]
+            i = bisect.bisect_left(index, (old, coin))
+            if i < len(index) and index[i] == (old, coin):
+                del index[i]
+
+    def remove(self, coin: str):
+        # the last row moves into the freed slot so the arrays stay dense
+        row = self.rows.pop(coin, None)
+        if row is None:
+            return
+        for profile in self.index:
+            self._unindex(profile, coin)
+        last = len(self.coins) - 1
+        if row != last:
+            moved = self.coins[last]
+            self.coins[row] = moved
+            self.names[row] = self.names[last]
+            self.updated_at[row] = self.updated_at[last]
+            self.subscores[row] = self.subscores[last]
+            self.confidences[row] = self.confidences[last]
+            self.rows[moved] = row
+        self.coins.pop()
+        self.names.pop()
+        self.subscores[last] = np.nan
+        self.confidences[last] = np.nan
+
+    def evict_oldest(self):
+        if self.coins:
+            self.remove(self.coins[int(np.argmin(self.updated_at[:len(self.coins)]))])
+
+    def _aggregate_rows(self, start: int, stop: int, *weight_vectors) -> tuple:
+        # -> ([master], [confidence], [coverage]) arrays per weight vector
+        subs = self.subscores[start:stop]
+        confs = self.confidences[start:stop]
+        present = ~np.isnan(subs)
+        # a verdict without a confidence counts as 0.5, like normalize_confidence(None)
+        confs = np.where(present & np.isnan(confs), 0.5, confs)
+        masters, conf_out, coverages = [], [], []
+        for w in weight_vectors:
+            wp = np.where(present, w, 0.0)
+            coverage = wp.sum(axis=1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                master = np.where(present, subs, 0.0) @ w / coverage
+                confidence = np.where(present, confs, 0.0) @ w / coverage
+            master[coverage <= 0] = np.nan
+            confidence[coverage <= 0] = np.nan
+            masters.append(master)
+            conf_out.append(confidence)
+            coverages.append(coverage)
+        return masters, conf_out, coverages
+
+    def reaggregate(self, weights: dict) -> tuple:
+        # -> (master, confidence, coverage) arrays aligned with self.coins
+        masters, confs, coverages = self._aggregate_rows(0, len(self.coins), self._weights(weights))
+        return masters[0], confs[0], coverages[0]
+
+    def _entry(self, row: int, master: float, confidence: float, coverage: float, rank: int) -> dict:
+        return {
+            "rank": rank,
+            "coin": self.coins[row],
+            "name": self.names[row],
+            "master_score": round(float(master), 2),
+            "confidence": round(float(confidence), 2),
+            "coverage": round(float(coverage), 2),
+            "subscores": {
+                c: None if np.isnan(v) else float(v) for c, v in zip(self.components, self.subscores[row])
+            },
+            "updated_at": float(self.updated_at[row]),
+        }
+
+    def top(self, profile: str, k: int = 10, bottom: bool = False) -> list:
+        # indexed path for a named profile
+        index = self.index[profile]
+        picked = index[:k] if bottom else index[:-k - 1:-1]
+        w = self._profile_lists[profile]
+        out = []
+        for rank, (_, coin) in enumerate(picked, 1):
+            row = self.rows[coin]
+            out.append(self._entry(row, *self._scalar(*self._row_values(row), w), rank))
+        return out
+
+    def top_weighted(self, weights: dict, k: int = 10, bottom: bool = False) -> list:
+        # what-if path: reaggregate the whole universe under ad-hoc weights
+        master, confidence, coverage = self.reaggregate(weights)
+        valid = np.flatnonzero(~np.isnan(master))
+        if valid.size == 0:
+            return []
+        key = master[valid] if bottom else -master[valid]
+        k = min(k, valid.size)
+        part = np.argpartition(key, k - 1)[:k]
+        order = valid[part[np.argsort(key[part], kind="stable")]]
+        return [self._entry(int(row), master[row], confidence[row], coverage[row], rank)
+                for rank, row in enumerate(order, 1)]
+
+    def stats(self) -> dict:
+        return {"coins": len(self.coins), "profiles": len(self.profiles)}
@@ -0,0 +1,174 @@
+import asyncio
+import contextlib
+import random
+import time
+from collections import deque
+
+# Adaptive concurrency limit for one upstream (AIMD).
+#
+# Calls beyond the current limit wait in a FIFO queue. A call that succeeds
+# while the limit is actually in use raises it by 1/limit (about +1 per round
+# trip's worth of calls); until the first decrease it raises it by 1 instead
+# (slow start: doubling per round trip), to find the level quickly. The
+# limit is multiplied by `backoff` when a latency exceeds `tolerance` x the
+# baseline (a slowly rising minimum of observed latencies), or when a call
+# fails while the recent failure ratio is above `failure_threshold`; the odd
+# random 500 is left to the retries. Only calls sent after the last decrease
+# can trigger another one, so a burst of failures under the old limit counts
+# once.
+#
+# call_with_retries() retries transient failures with full-jitter exponential
+# backoff, queueing for a slot again on every attempt.
+
+
+def _always(e: BaseException) -> bool:
+    return True
+
+
+class AdaptiveLimiter:
+    def __init__(self, name: str, initial: int = 8, min_limit: int = 1, max_limit: int = 256,
+                 tolerance: float = 2.0, backoff: float = 0.7, failure_threshold: float = 0.2):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.failure_ratio = 0.0
+        self.inflight = 0
+        self.waiters = deque()
+        self.baseline = None
+        self.last_latency = None
+        self.max_queued = 0
+        self.successes = 0
+        self.failures = 0
+        self.slow = 0
+        self.decreases = 0
+        self.retries = 0
+        self._last_decrease = 0.0
+        self.slow_start = True
+
+    def set_max(self, max_limit: int):
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(self.limit, self.max_limit)
+        self._wake()
+
+    def _wake(self):
+        while self.waiters and self.inflight < int(self.limit):
+            fut = self.waiters.popleft()
+            if not fut.done():
+                self.inflight += 1
+                fut.set_result(None)
+
+    async def acquire(self) -> float:
+        # -> start time for release()
+        if not self.waiters and self.inflight < int(self.limit):
+            self.inflight += 1
+            return time.monotonic()
+
+        fut = asyncio.get_running_loop().create_future()
+        self.waiters.append(fut)
+        self.max_queued = max(self.max_queued, len(self.waiters))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # granted a slot just as we were cancelled: pass it on
+                self.inflight -= 1
+                self._wake()
+            else:
+                with contextlib.suppress(ValueError):
+                    self.waiters.remove(fut)
+            raise
+        return time.monotonic()
+
+    def _decrease(self, started: float):
+        if started < self._last_decrease:
+            return
+        self.limit = max(float(self.min_limit), self.limit * self.backoff)
+        self._last_decrease = time.monotonic()
+        self.decreases += 1
+        self.slow_start = False
+
+    def release(self, started: float, outcome: str):
+        # outcome: "ok", "failure", or "dropped" (cancelled by the caller, e.g. a deadline)
+        busy = self.inflight >= int(self.limit) * 0.8 or bool(self.waiters)
+        self.inflight -= 1
+        latency = time.monotonic() - started
+
+        if outcome != "dropped":
+            # moving failure ratio over roughly the last 20 calls
+            self.failure_ratio += ((outcome == "failure") - self.failure_ratio) * 0.05
+
+        if outcome == "ok":
+            self.successes += 1
+            self.last_latency = latency
+            if self.baseline is None or latency < self.baseline:
+                self.baseline = latency
+            else:
+                # drift up slowly so a permanently slower upstream gets a new normal
+                self.baseline += (latency - self.baseline) * 0.01
+            if latency > self.baseline * self.tolerance:
+                self.slow += 1
+                self._decrease(started)
+            elif busy:
+                step = 1.0 if self.slow_start else 1.0 / self.limit
+                self.limit = min(float(self.max_limit), self.limit + step)
+        elif outcome == "failure":
+            self.failures += 1
+            if self.failure_ratio > self.failure_threshold:
+                self._decrease(started)
+        elif self.baseline is not None and latency > self.baseline * self.tolerance:
+            # given up on after taking too long: as good as a timeout
+            self.slow += 1
+            self._decrease(started)
+
+        self._wake()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, is_failure=_always):
+        started = await self.acquire()
+        outcome = "ok"
+        try:
+            yield
+        except asyncio.CancelledError:
+            outcome = "dropped"
+            raise
+        except Exception as e:
+            outcome = "failure" if is_failure(e) else "ok"
+            raise
+        finally:
+            self.release(started, outcome)
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "inflight": self.inflight,
+            "queued": len(self.waiters),
+            "max_queued": self.max_queued,
+            "baseline_ms": round(self.baseline * 1000.0, 1) if self.baseline is not None else None,
+            "last_latency_ms": round(self.last_latency * 1000.0, 1) if self.last_latency is not None else None,
+            "successes": self.successes,
+            "failures": self.failures,
+            "failure_ratio": round(self.failure_ratio, 3),
+            "slow": self.slow,
+            "decreases": self.decreases,
+            "retries": self.retries,
+        }
+
+
+async def call_with_retries(limiter: AdaptiveLimiter, fn, retries: int = 2, base_s: float = 0.25,
+                            is_failure=_always, retryable=_always):
+    # fn() -> awaitable; retried up to `retries` times on exceptions retryable() accepts
+    attempt = 0
+    while True:
+        try:
+            async with limiter.slot(is_failure):
+                return await fn()
+        except Exception as e:
+            if attempt >= retries or not retryable(e):
+                raise
+        limiter.retries += 1
+        await asyncio.sleep(random.uniform(0.0, base_s * 2 ** attempt))
+        attempt += 1
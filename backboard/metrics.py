@@ -0,0 +1,149 @@
+import contextlib
+import contextvars
+import time
+
+# Stage timing for the scoring path.
+#
+# span(stage, **labels) times a block of code. Every span feeds a process-wide
+# latency histogram and error counter per (stage, labels), which render()
+# exposes in Prometheus text format for /metrics. Spans that run inside a
+# start_timings() scope are also appended to that scope's list, which the
+# orchestrator returns as the result's "timings" block.
+
+PREFIX = "bigscore"
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.total += seconds
+        self.count += 1
+        for i, le in enumerate(BUCKETS):
+            if seconds <= le:
+                self.counts[i] += 1
+                break
+
+
+_histograms = {}
+_errors = {}
+_counters = {}
+_gauges = {}
+_timings = contextvars.ContextVar("timings", default=None)
+
+
+def _key(stage: str, labels: dict) -> tuple:
+    return (stage,) + tuple(sorted(labels.items()))
+
+
+def observe(stage: str, seconds: float, ok: bool = True, **labels):
+    key = _key(stage, labels)
+    hist = _histograms.get(key)
+    if hist is None:
+        hist = _histograms[key] = Histogram()
+    hist.observe(seconds)
+    if not ok:
+        _errors[key] = _errors.get(key, 0) + 1
+
+    timings = _timings.get()
+    if timings is not None:
+        timings.append({"stage": stage, **labels, "ms": round(seconds * 1000.0, 2), "ok": ok})
+
+
+@contextlib.contextmanager
+def span(stage: str, **labels):
+    start = time.perf_counter()
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        observe(stage, time.perf_counter() - start, ok, **labels)
+
+
+def start_timings() -> list:
+    # spans recorded from here on in this context (and tasks it spawns) land in the list
+    timings = []
+    _timings.set(timings)
+    return timings
+
+
+def inc(name: str, value: int = 1, **labels):
+    key = _key(name, labels)
+    _counters[key] = _counters.get(key, 0) + value
+
+
+def register_gauges(group: str, fn):
+    # fn() -> {name: number}; read at scrape time
+    _gauges[group] = fn
+
+
+def snapshot() -> dict:
+    # every registered gauge group as {group: {name: value}}, for JSON diagnostics
+    out = {}
+    for group, fn in sorted(_gauges.items()):
+        try:
+            out[group] = fn() or {}
+        except Exception as e:
+            out[group] = {"error": f"{type(e).__name__}: {e}"}
+    return out
+
+
+def _labels(key: tuple, extra: str = "") -> str:
+    stage, *pairs = key
+    parts = [f'stage="{stage}"'] + [f'{k}="{v}"' for k, v in pairs]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}"
+
+
+def render() -> str:
+    lines = [
+        f"# HELP {PREFIX}_stage_seconds Latency of each scoring stage.",
+        f"# TYPE {PREFIX}_stage_seconds histogram",
+    ]
+    for key, hist in sorted(_histograms.items()):
+        cumulative = 0
+        for le, n in zip(BUCKETS, hist.counts):
+            cumulative += n
+            le_label = 'le="%s"' % le
+            lines.append(f"{PREFIX}_stage_seconds_bucket{_labels(key, le_label)} {cumulative}")
+        inf_label = 'le="+Inf"'
+        lines.append(f"{PREFIX}_stage_seconds_bucket{_labels(key, inf_label)} {hist.count}")
+        lines.append(f"{PREFIX}_stage_seconds_sum{_labels(key)} {hist.total:.6f}")
+        lines.append(f"{PREFIX}_stage_seconds_count{_labels(key)} {hist.count}")
+
+    lines.append(f"# HELP {PREFIX}_stage_errors_total Scoring stages that raised.")
+    lines.append(f"# TYPE {PREFIX}_stage_errors_total counter")
+    for key, n in sorted(_errors.items()):
+        lines.append(f"{PREFIX}_stage_errors_total{_labels(key)} {n}")
+
+    last_name = None
+    for (name, *pairs), n in sorted(_counters.items()):
+        if name != last_name:
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            last_name = name
+        labels = "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}" if pairs else ""
+        lines.append(f"{PREFIX}_{name}_total{labels} {n}")
+
+    for group, fn in sorted(_gauges.items()):
+        try:
+            values = fn() or {}
+        except Exception:
+            continue
+        for name, value in sorted(values.items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            lines.append(f"# TYPE {PREFIX}_{group}_{name} gauge")
+            lines.append(f"{PREFIX}_{group}_{name} {value}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,256 @@
+import json
+import math
+
+# Typed, slot-based views of a contextForAI and of an agent verdict.
+#
+# A context is parsed once, when it is fetched: each section keeps the numeric
+# fields the local scorers read, already coerced, plus its compact JSON, which
+# is exactly what the agent prompts embed. The nested dicts are dropped, so a
+# cache or a batch job holding thousands of contexts keeps a few small objects
+# and one string per section instead of a tree of dicts. A section of the wrong
+# shape is rejected with ContextError naming the field.
+#
+# AgentVerdict checks an agent's parsed reply the moment it arrives and
+# raises VerdictError (a ValueError) with the offending field, so a malformed
+# reply never reaches the cache or aggregation.
+
+SECTIONS = ("market_integrity", "dev_velocity", "on_chain_security", "social_sentiment")
+
+# Each agent only sees its own section plus these identifying fields.
+BASE_KEYS = ("name", "symbol", "age_days")
+
+
+class ContextError(ValueError):
+    pass
+
+
+class VerdictError(ValueError):
+    pass
+
+
+def compact_json(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def to_float(x, default=0.5):
+    try:
+        if x is None:
+            return default
+        if isinstance(x, str):
+            x = x.strip()
+        return float(x)
+    except Exception:
+        return default
+
+
+def tri_state(value):
+    # True / False / None for the booleans and "Unknown" strings Alchemy gives us
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        v = value.strip().lower()
+        if v in ("true", "yes"):
+            return True
+        if v in ("false", "no"):
+            return False
+    return None
+
+
+def _object(value, path: str) -> dict:
+    # missing / null / empty -> {}; anything else must be an object
+    value = value or {}
+    if not isinstance(value, dict):
+        raise ContextError(f"{path}: expected an object, got {type(value).__name__}")
+    return value
+
+
+def _text(value, path: str):
+    if value is not None and not isinstance(value, str):
+        raise ContextError(f"{path}: expected a string, got {type(value).__name__}")
+    return value
+
+
+class Section:
+    # numeric fields are to_float(raw, None): None when missing or unparseable
+    __slots__ = ("json",)
+
+    def __init__(self, raw, path: str):
+        self.json = compact_json(raw)
+        self._parse(_object(raw, path), path)
+
+    def _parse(self, raw: dict, path: str):
+        pass
+
+
+class MarketIntegrity(Section):
+    __slots__ = ("market_cap_usd", "fdv_usd", "volume_24h_usd", "vol_to_mc_ratio", "ath_change_percent",
+                 "change_24h", "change_7d", "known_performance")
+
+    def _parse(self, raw: dict, path: str):
+        perf = _object(raw.get("performance"), path + ".performance")
+        extremes = _object(raw.get("extremes"), path + ".extremes")
+        self.market_cap_usd = to_float(raw.get("market_cap_usd"), None)
+        self.fdv_usd = to_float(raw.get("fdv_usd"), None)
+        self.volume_24h_usd = to_float(raw.get("volume_24h_usd"), None)
+        self.vol_to_mc_ratio = to_float(raw.get("vol_to_mc_ratio"), None)
+        self.ath_change_percent = to_float(extremes.get("ath_change_percent"), None)
+        self.change_24h = to_float(perf.get("change_24h"), None)
+        self.change_7d = to_float(perf.get("change_7d"), None)
+        self.known_performance = sum(1 for v in perf.values() if to_float(v, None) is not None)
+
+
+class DevVelocity(Section):
+    __slots__ = ("stars", "recent_commits_4w", "total_issues", "issue_resolution_rate", "last_commit_age_days")
+
+    def _parse(self, raw: dict, path: str):
+        self.stars = to_float(raw.get("stars"), None)
+        self.recent_commits_4w = to_float(raw.get("recent_commits_4w"), None)
+        self.total_issues = to_float(raw.get("total_issues"), None)
+        self.issue_resolution_rate = to_float(raw.get("issue_resolution_rate"), None)
+        self.last_commit_age_days = to_float(raw.get("last_commit_age_days"), None)
+
+
+class OnChainSecurity(Section):
+    __slots__ = ("present", "note", "is_renounced", "has_burned_liquidity", "top_holder_concentration",
+                 "is_contract_verified", "has_logo_verification", "has_deployer")
+
+    def _parse(self, raw: dict, path: str):
+        self.present = bool(raw)
+        self.note = raw.get("note")
+        self.is_renounced = tri_state(raw.get("is_renounced"))
+        self.has_burned_liquidity = bool(raw.get("has_burned_liquidity"))
+        self.top_holder_concentration = to_float(raw.get("top_holder_concentration"), None)
+        self.is_contract_verified = bool(raw.get("is_contract_verified"))
+        self.has_logo_verification = bool(raw.get("has_logo_verification"))
+        self.has_deployer = bool(raw.get("deployer_address"))
+
+
+class SocialSentiment(Section):
+    __slots__ = ("reddit_subscribers", "reddit_active_accounts_48h", "sentiment_votes_up_pct",
+                 "sentiment_votes_down_pct", "twitter_followers")
+
+    def _parse(self, raw: dict, path: str):
+        self.reddit_subscribers = to_float(raw.get("reddit_subscribers"), None)
+        self.reddit_active_accounts_48h = to_float(raw.get("reddit_active_accounts_48h"), None)
+        self.sentiment_votes_up_pct = to_float(raw.get("sentiment_votes_up_pct"), None)
+        self.sentiment_votes_down_pct = to_float(raw.get("sentiment_votes_down_pct"), None)
+        self.twitter_followers = to_float(raw.get("twitter_followers"), None)
+
+
+SECTION_TYPES = {
+    "market_integrity":  MarketIntegrity,
+    "dev_velocity":      DevVelocity,
+    "on_chain_security": OnChainSecurity,
+    "social_sentiment":  SocialSentiment,
+}
+
+
+class CoinContext:
+    # immutable once built: a cache can hand the same instance to every request
+    __slots__ = ("name", "symbol", "age_days", "base", "base_json") + SECTIONS
+
+    @classmethod
+    def parse(cls, ctx: dict) -> "CoinContext":
+        # raises ContextError for a context or section of the wrong shape
+        if not isinstance(ctx, dict):
+            raise ContextError(f"context: expected an object, got {type(ctx).__name__}")
+        base = {k: ctx[k] for k in BASE_KEYS if k in ctx}
+        # a missing section serializes as {}, like ctx.get(section, {})
+        sections = {s: SECTION_TYPES[s](ctx.get(s, {}), s) for s in SECTIONS}
+        return cls._build(base, sections)
+
+    @classmethod
+    def _build(cls, base: dict, sections: dict) -> "CoinContext":
+        self = cls.__new__(cls)
+        self.base = base
+        self.name = _text(base.get("name"), "name")
+        self.symbol = _text(base.get("symbol"), "symbol")
+        self.age_days = to_float(base.get("age_days"), None)
+        self.base_json = ",".join(f"{compact_json(k)}:{compact_json(v)}" for k, v in base.items())
+        for s in SECTIONS:
+            setattr(self, s, sections[s])
+        return self
+
+    def merged(self, other: "CoinContext", sections) -> "CoinContext":
+        # a copy with `sections` (and any identifying fields) taken from a partial refetch
+        base = {**self.base, **other.base}
+        return self._build(base, {s: getattr(other if s in sections else self, s) for s in SECTIONS})
+
+    def payload_json(self, section: str) -> str:
+        # == compact_json({name, symbol, age_days, section}), from the cached pieces
+        body = f"{compact_json(section)}:{getattr(self, section).json}"
+        return "{" + (self.base_json + "," + body if self.base_json else body) + "}"
+
+    def projection(self, section: str) -> dict:
+        # a fresh dict of what the agent for `section` sees, for fingerprinting
+        return json.loads(self.payload_json(section))
+
+    def to_dict(self) -> dict:
+        return {**self.base, **{s: json.loads(getattr(self, s).json) for s in SECTIONS}}
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.base_json) + sum(len(getattr(self, s).json) for s in SECTIONS)
+
+
+def section_of(ctx, section: str) -> Section:
+    # the typed section of a CoinContext, or parsed on the spot from a plain dict
+    if isinstance(ctx, CoinContext):
+        return getattr(ctx, section)
+    return SECTION_TYPES[section]((ctx or {}).get(section, {}), section)
+
+
+def normalize_confidence(x):
+    x = to_float(x, default=0.5)
+    # 如果 agent 給的是百分制 (0-100)
+    if x > 1.0:
+        x = x / 100.0
+    # clamp 到 [0,1]
+    if x < 0.0:
+        x = 0.0
+    if x > 1.0:
+        x = 1.0
+    return x
+
+
+class AgentVerdict:
+    __slots__ = ("subscore", "confidence", "flags", "explanation", "details")
+
+    @classmethod
+    def parse(cls, parsed) -> "AgentVerdict":
+        # raises VerdictError if it can't be scored; optional fields fall back
+        if not isinstance(parsed, dict):
+            raise VerdictError(f"verdict: expected an object, got {type(parsed).__name__}")
+        if parsed.get("subscore") is None:
+            raise VerdictError("verdict.subscore: missing")
+        subscore = to_float(parsed["subscore"], None)
+        if subscore is None:
+            raise VerdictError(f"verdict.subscore: expected a number, got {parsed['subscore']!r}")
+        if not math.isfinite(subscore):
+            raise VerdictError(f"verdict.subscore: expected a finite number, got {parsed['subscore']!r}")
+        # a missing or unparseable confidence means 0.5; a non-finite one is malformed
+        confidence = to_float(parsed.get("confidence"), None)
+        if confidence is not None and not math.isfinite(confidence):
+            raise VerdictError(f"verdict.confidence: expected a finite number, got {parsed['confidence']!r}")
+
+        flags = parsed.get("flags") or []
+        if not isinstance(flags, list):
+            flags = [flags]
+        details = parsed.get("details")
+
+        self = cls.__new__(cls)
+        self.subscore = max(0.0, min(100.0, subscore))
+        self.confidence = normalize_confidence(parsed.get("confidence"))
+        self.flags = [str(f) for f in flags]
+        self.explanation = str(parsed.get("explanation") or "")
+        self.details = details if isinstance(details, dict) else {}
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "subscore": self.subscore,
+            "confidence": self.confidence,
+            "flags": list(self.flags),
+            "explanation": self.explanation,
+            "details": self.details,
+        }
@@ -1,9 +1,28 @@
+import argparse
 import asyncio
+import contextlib
 import math
 import os
-import sys, json
+import sys, json, time
 from backboard import BackboardClient
 
+from agent_batch import AgentBatcher, BatchMiss
+from agent_cache import AgentCache, DEFAULT_DIR as AGENT_CACHE_DEFAULT_DIR
+from capture import CaptureWriter, ReplayArchive
+from context_cache import ContextCache, normalize_coin
+from context_pool import ContextWorkerPool
+from event_feed import EventFeed
+from history import HistoryStore, DEFAULT_PATH as HISTORY_DEFAULT_PATH
+from json_stream import JsonObjectScanner
+from leaderboard import Scoreboard
+from limiter import AdaptiveLimiter, call_with_retries
+from models import (AgentVerdict, CoinContext, VerdictError, compact_json, normalize_confidence, section_of,
+                    to_float)
+from rescore import RescoreStore, fingerprint
+from thread_pool import ThreadPool
+from warm import TokenBucket, WarmRefresher, fetch_top_coins
+import metrics
+
 
 
 
@@ -13,6 +32,167 @@ MARKET_AGENT_ID  = os.getenv("MARKET_AGENT_ID", "").strip()
 DEV_AGENT_ID     = os.getenv("DEV_AGENT_ID", "").strip()
 ONCHAIN_AGENT_ID = os.getenv("ONCHAIN_AGENT_ID", "").strip()
 
+# persistent node workers for get_context; 0 = spawn get_context.js per call
+CONTEXT_WORKERS   = int(os.getenv("CONTEXT_WORKERS", "2"))
+CONTEXT_TIMEOUT_S = float(os.getenv("CONTEXT_TIMEOUT_S", "60"))
+
+# contextForAI cache; CONTEXT_CACHE_MAX_BYTES=0 disables it
+CONTEXT_CACHE_MAX_BYTES = int(os.getenv("CONTEXT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+CONTEXT_CACHE_STALE_S   = float(os.getenv("CONTEXT_CACHE_STALE_S", "600"))
+CONTEXT_TTLS = {
+    "market_integrity":  float(os.getenv("CONTEXT_TTL_MARKET_S", "60")),
+    "social_sentiment":  float(os.getenv("CONTEXT_TTL_SOCIAL_S", "900")),
+    "dev_velocity":      float(os.getenv("CONTEXT_TTL_DEV_S", "21600")),
+    "on_chain_security": float(os.getenv("CONTEXT_TTL_ONCHAIN_S", "21600")),
+}
+
+COMPONENTS = ("market_integrity", "dev_velocity", "on_chain_security", "social_sentiment")
+
+# components scored by a Backboard agent (social_sentiment is computed locally)
+AGENT_IDS = {
+    "market_integrity":  MARKET_AGENT_ID,
+    "dev_velocity":      DEV_AGENT_ID,
+    "on_chain_security": ONCHAIN_AGENT_ID,
+}
+
+# master score weights
+WEIGHTS = {
+    "market_integrity":  0.25,
+    "dev_velocity":      0.20,
+    "on_chain_security": 0.35,
+    "social_sentiment":  0.20,
+}
+
+# named weight profiles for reweighting (?profile=) and the leaderboard;
+# WEIGHT_PROFILES_JSON='{"name": {"market_integrity": 0.5, ...}}' adds or overrides
+WEIGHT_PROFILES = {
+    "default": WEIGHTS,
+    "conservative": {
+        "market_integrity":  0.20,
+        "dev_velocity":      0.15,
+        "on_chain_security": 0.50,
+        "social_sentiment":  0.15,
+    },
+    "momentum": {
+        "market_integrity":  0.45,
+        "dev_velocity":      0.10,
+        "on_chain_security": 0.15,
+        "social_sentiment":  0.30,
+    },
+    "builder": {
+        "market_integrity":  0.15,
+        "dev_velocity":      0.45,
+        "on_chain_security": 0.25,
+        "social_sentiment":  0.15,
+    },
+}
+
+def check_weights(weights, what: str = "weights") -> dict:
+    # -> {component: float}; ValueError unless every key is a component and the
+    # weights are finite, non-negative and not all zero
+    if not isinstance(weights, dict):
+        raise ValueError(f"{what} must be an object of component weights")
+    unknown = [c for c in weights if c not in COMPONENTS]
+    if unknown:
+        raise ValueError(f"{what}: unknown components {unknown} (expected {', '.join(COMPONENTS)})")
+    out = {}
+    for c, w in weights.items():
+        if isinstance(w, bool) or not isinstance(w, (int, float)) or not math.isfinite(w) or w < 0:
+            raise ValueError(f"{what}: weight of {c} must be a non-negative number, got {w!r}")
+        out[c] = float(w)
+    if sum(out.values()) <= 0:
+        raise ValueError(f"{what}: weights must not all be zero")
+    return out
+
+# profile names are matched lowercased (resolve_profile); a bad profile fails at startup
+_extra_profiles = json.loads(os.getenv("WEIGHT_PROFILES_JSON", "").strip() or "{}")
+if not isinstance(_extra_profiles, dict):
+    raise ValueError("WEIGHT_PROFILES_JSON must be an object mapping profile names to weights")
+for _name, _weights in _extra_profiles.items():
+    WEIGHT_PROFILES[_name.strip().lower()] = check_weights(_weights, f"WEIGHT_PROFILES_JSON profile '{_name}'")
+
+# coins kept in the in-memory leaderboard (seeded from HISTORY_DB at server start)
+LEADERBOARD_CAPACITY = int(os.getenv("LEADERBOARD_CAPACITY", "4096"))
+
+# key of each component under result["details"]
+DETAIL_KEYS = {
+    "market_integrity":  "market",
+    "dev_velocity":      "dev",
+    "on_chain_security": "onchain",
+    "social_sentiment":  "social",
+}
+
+# adaptive in-flight limits per upstream (limiter.py), retried with jittered backoff
+CONTEXT_LIMIT_INITIAL   = int(os.getenv("CONTEXT_LIMIT_INITIAL", "4"))
+CONTEXT_LIMIT_MAX       = int(os.getenv("CONTEXT_LIMIT_MAX", "64"))
+AGENT_LIMIT_INITIAL     = int(os.getenv("AGENT_LIMIT_INITIAL", "16"))
+AGENT_LIMIT_MAX         = int(os.getenv("AGENT_LIMIT_MAX", "256"))
+LIMIT_LATENCY_TOLERANCE = float(os.getenv("LIMIT_LATENCY_TOLERANCE", "3.0"))
+LIMIT_FAILURE_THRESHOLD = float(os.getenv("LIMIT_FAILURE_THRESHOLD", "0.2"))
+CONTEXT_RETRIES         = int(os.getenv("CONTEXT_RETRIES", "1"))
+AGENT_RETRIES           = int(os.getenv("AGENT_RETRIES", "2"))
+RETRY_BASE_S            = float(os.getenv("RETRY_BASE_S", "0.25"))
+
+# latency budget for one scoring; an agent that misses it is excluded
+SCORE_BUDGET_S  = float(os.getenv("SCORE_BUDGET_S", "45"))
+AGENT_TIMEOUT_S = float(os.getenv("AGENT_TIMEOUT_S", "30"))
+
+# agent verdict cache; AGENT_CACHE_MAX_ENTRIES=0 disables it, AGENT_CACHE_DIR="" keeps it in memory only
+AGENT_CACHE_MAX_ENTRIES = int(os.getenv("AGENT_CACHE_MAX_ENTRIES", "1024"))
+AGENT_CACHE_DIR         = os.getenv("AGENT_CACHE_DIR", AGENT_CACHE_DEFAULT_DIR).strip()
+
+# reuse a coin's last agent verdict while its inputs moved less than RESCORE_TOLERANCE
+# (relative, per number); RESCORE_MAX_COINS=0 always re-asks the agents
+RESCORE_TOLERANCE = float(os.getenv("RESCORE_TOLERANCE", "0.05"))
+RESCORE_MAX_AGE_S = float(os.getenv("RESCORE_MAX_AGE_S", "86400"))
+RESCORE_MAX_COINS = int(os.getenv("RESCORE_MAX_COINS", "4096"))
+
+# every result is appended to a local SQLite time series; HISTORY_DB="" turns it off
+HISTORY_DB            = os.getenv("HISTORY_DB", HISTORY_DEFAULT_PATH).strip()
+HISTORY_RAW_KEEP_S    = float(os.getenv("HISTORY_RAW_KEEP_S", str(7 * 86400)))
+HISTORY_HOURLY_KEEP_S = float(os.getenv("HISTORY_HOURLY_KEEP_S", str(90 * 86400)))
+
+# warm universe (server): WARM_COINS plus CoinGecko's top WARM_TOP_N plus the
+# WARM_POPULAR_N most requested coins are rescored in the background every
+# WARM_REFRESH_S and served from memory while younger than WARM_MAX_AGE_S.
+# The refresher's own upstream calls are paced by the WARM_*_RPS token buckets.
+WARM_COINS          = [c.strip() for c in os.getenv("WARM_COINS", "").split(",") if c.strip()]
+WARM_TOP_N          = int(os.getenv("WARM_TOP_N", "0"))
+WARM_POPULAR_N      = int(os.getenv("WARM_POPULAR_N", "0"))
+WARM_REFRESH_S      = float(os.getenv("WARM_REFRESH_S", "300"))
+WARM_MAX_AGE_S      = float(os.getenv("WARM_MAX_AGE_S", "900"))
+WARM_CONCURRENCY    = int(os.getenv("WARM_CONCURRENCY", "2"))
+WARM_PAUSE_INFLIGHT = int(os.getenv("WARM_PAUSE_INFLIGHT", "8"))
+WARM_RATES = {
+    "coingecko": float(os.getenv("WARM_COINGECKO_RPS", "0.2")),
+    "alchemy":   float(os.getenv("WARM_ALCHEMY_RPS", "0.2")),
+    "backboard": float(os.getenv("WARM_BACKBOARD_RPS", "0.5")),
+}
+
+# fast: local scorers only; full: Backboard agents; hybrid: agents only where
+# the local scorer's confidence is below HYBRID_MIN_CONFIDENCE
+TIERS = ("fast", "full", "hybrid")
+SCORING_TIER          = os.getenv("SCORING_TIER", "full").strip().lower()
+HYBRID_MIN_CONFIDENCE = float(os.getenv("HYBRID_MIN_CONFIDENCE", "0.7"))
+# the leaderboard ranks results of this tier only, so heuristic and agent
+# verdicts never share a ranking (history still records every tier)
+LEADERBOARD_TIER      = os.getenv("LEADERBOARD_TIER", "full").strip().lower()
+if LEADERBOARD_TIER not in TIERS:
+    raise ValueError(f"unknown LEADERBOARD_TIER '{LEADERBOARD_TIER}' (expected one of {', '.join(TIERS)})")
+
+# pre-created Backboard threads per assistant; THREAD_POOL_SIZE=0 creates one per call
+THREAD_POOL_SIZE      = int(os.getenv("THREAD_POOL_SIZE", "4"))
+THREAD_MAX_USES       = int(os.getenv("THREAD_MAX_USES", "1"))
+THREAD_POOL_MAX_BOUND = int(os.getenv("THREAD_POOL_MAX_BOUND", "64"))
+
+# AGENT_BATCH_SIZE>1 packs up to that many coins into one message per agent, waiting at
+# most AGENT_BATCH_LINGER_S for a batch to fill; coins missing from the reply are asked alone
+AGENT_BATCH_SIZE     = int(os.getenv("AGENT_BATCH_SIZE", "1"))
+AGENT_BATCH_LINGER_S = float(os.getenv("AGENT_BATCH_LINGER_S", "0.05"))
+
+# AGENT_STREAM=1 streams agent replies and stops reading once the JSON object closes
+AGENT_STREAM = os.getenv("AGENT_STREAM", "0").strip().lower() not in ("", "0", "false")
+
 def extract_json(text: str) -> dict:
     t = text.strip()
 
@@ -32,7 +212,98 @@ def extract_json(text: str) -> dict:
     return json.loads(t)
 
 
+_context_limiter = AdaptiveLimiter("context", CONTEXT_LIMIT_INITIAL, 1, CONTEXT_LIMIT_MAX,
+                                   LIMIT_LATENCY_TOLERANCE, failure_threshold=LIMIT_FAILURE_THRESHOLD)
+_agent_limiter = AdaptiveLimiter("agents", AGENT_LIMIT_INITIAL, 1, AGENT_LIMIT_MAX,
+                                 LIMIT_LATENCY_TOLERANCE, failure_threshold=LIMIT_FAILURE_THRESHOLD)
+
+def set_concurrency(context: int = None, agents: int = None):
+    # caps for the adaptive limits (the batch CLI's --*-concurrency)
+    if context:
+        _context_limiter.set_max(context)
+    if agents:
+        _agent_limiter.set_max(agents)
+
+
+def _transient(e: BaseException) -> bool:
+    # an upstream failure that says something about its load, unlike a bad
+    # coin name or a 4xx for our own request
+    status = getattr(e, "status_code", None)
+    if isinstance(status, int) and 400 <= status < 500 and status not in (408, 429):
+        return False
+    return "No coin found" not in str(e)
+
+
+def _retryable(e: BaseException) -> bool:
+    # a timeout has already used up the time a retry would need
+    return _transient(e) and not isinstance(e, TimeoutError)
+
+
+_context_pool = None
+
+def get_context_pool() -> ContextWorkerPool:
+    global _context_pool
+    if _context_pool is None:
+        _context_pool = ContextWorkerPool(CONTEXT_WORKERS, CONTEXT_TIMEOUT_S)
+    return _context_pool
+
+
+async def close_context_pool():
+    global _context_pool
+    if _context_pool is not None:
+        await _context_pool.close()
+        _context_pool = None
+
+
+async def fetch_context(coin_name: str, sections=None) -> tuple:
+    # -> (resolved coin id, context); sections=None fetches every section
+    if _replay is not None:
+        coin_id, text = await _replay.context(normalize_coin(coin_name))
+        return coin_id, json.loads(text)
+    started = time.perf_counter()
+    try:
+        coin_id, ctx = await call_with_retries(
+            _context_limiter, lambda: context_upstream(coin_name, sections),
+            CONTEXT_RETRIES, RETRY_BASE_S, _transient, _retryable,
+        )
+    except Exception as e:
+        if _capture is not None:
+            _capture.context(normalize_coin(coin_name), sections, None, None, time.perf_counter() - started,
+                             error=describe_failure(e))
+        raise
+    if _capture is not None:
+        _capture.context(normalize_coin(coin_name), sections, coin_id, compact_json(ctx),
+                         time.perf_counter() - started)
+    return coin_id, ctx
+
+
+async def context_upstream(coin_name: str, sections=None) -> tuple:
+    # one attempt, without limits or retries
+    with metrics.span("context_upstream"):
+        if CONTEXT_WORKERS > 0:
+            return await get_context_pool().get_context(coin_name, sections)
+        # get_context.js always returns the full context and doesn't report the id
+        return coin_name.strip().lower(), await spawn_context_for_ai(coin_name)
+
+
 async def get_context_for_ai(coin_name: str) -> dict:
+    _, ctx = await fetch_context(coin_name)
+    return ctx
+
+
+_context_cache = ContextCache(
+    lambda coin_name, sections: fetch_context(coin_name, sections),
+    CONTEXT_TTLS, CONTEXT_CACHE_MAX_BYTES, CONTEXT_CACHE_STALE_S,
+)
+
+async def get_context_cached(coin_name: str) -> tuple:
+    # -> (CoinContext, cache info reported under result["cache"]["context"])
+    if CONTEXT_CACHE_MAX_BYTES <= 0:
+        return CoinContext.parse(await get_context_for_ai(coin_name)), {"status": "disabled"}
+    return await _context_cache.get(coin_name)
+
+
+async def spawn_context_for_ai(coin_name: str) -> dict:
     proc = await asyncio.create_subprocess_exec(
         "node", "backboard/scripts/get_context.js", coin_name,
         stdout=asyncio.subprocess.PIPE,
@@ -82,39 +353,22 @@ async def get_context_for_ai(coin_name: str) -> dict:
             f"stderr:\n{err}"
         )
 
-def to_float(x, default=0.5):
-    try:
-        if x is None:
-            return default
-        if isinstance(x, str):
-            x = x.strip()
-        return float(x)
-    except Exception:
-        return default
-
-def normalize_confidence(x):
-    x = to_float(x, default=0.5)
-    # 如果 agent 給的是百分制 (0-100)
-    if x > 1.0:
-        x = x / 100.0
-    # clamp 到 [0,1]
-    if x < 0.0:
-        x = 0.0
-    if x > 1.0:
-        x = 1.0
-    return x
-
 def clamp(x, lo, hi):
     return max(lo, min(hi, x))
 
-def score_social(ctx: dict) -> dict:
-    social = (ctx or {}).get("social_sentiment", {}) or {}
+def check_verdict(parsed: dict) -> dict:
+    # normalize an agent verdict; raises VerdictError (a ValueError) if it can't be scored
+    return AgentVerdict.parse(parsed).to_dict()
 
-    reddit_subscribers = max(0.0, to_float(social.get("reddit_subscribers"), 0.0))
-    reddit_active_48h = max(0.0, to_float(social.get("reddit_active_accounts_48h"), 0.0))
-    up_pct = clamp(to_float(social.get("sentiment_votes_up_pct"), 50.0), 0.0, 100.0)
-    down_pct = clamp(to_float(social.get("sentiment_votes_down_pct"), 50.0), 0.0, 100.0)
-    twitter_followers = max(0.0, to_float(social.get("twitter_followers"), 0.0))
+def score_social(ctx) -> dict:
+    # ctx: a CoinContext, or a plain contextForAI dict
+    social = section_of(ctx, "social_sentiment")
+
+    reddit_subscribers = max(0.0, to_float(social.reddit_subscribers, 0.0))
+    reddit_active_48h = max(0.0, to_float(social.reddit_active_accounts_48h, 0.0))
+    up_pct = clamp(to_float(social.sentiment_votes_up_pct, 50.0), 0.0, 100.0)
+    down_pct = clamp(to_float(social.sentiment_votes_down_pct, 50.0), 0.0, 100.0)
+    twitter_followers = max(0.0, to_float(social.twitter_followers, 0.0))
 
     # Log scaling keeps very large communities from dominating the score.
     reddit_size_score = clamp((math.log10(reddit_subscribers + 1) / 6.0) * 100.0, 0.0, 100.0)
@@ -187,6 +441,269 @@ def score_social(ctx: dict) -> dict:
     }
 
 
+# Rule-based counterparts of the three agents, over the same numeric fields
+# cleanSleuthData builds. They return the agents' verdict shape, so the
+# "fast" tier can score without an LLM and "hybrid" can skip confident ones.
+
+def score_market_local(ctx) -> dict:
+    market = section_of(ctx, "market_integrity")
+
+    mc = max(0.0, to_float(market.market_cap_usd, 0.0))
+    fdv = max(0.0, to_float(market.fdv_usd, 0.0))
+    volume = max(0.0, to_float(market.volume_24h_usd, 0.0))
+    vol_to_mc = max(0.0, to_float(market.vol_to_mc_ratio, volume / mc if mc > 0 else 0.0))
+    ath_change = market.ath_change_percent
+    change_24h = to_float(market.change_24h, 0.0)
+    change_7d = to_float(market.change_7d, 0.0)
+    known_perf = market.known_performance
+
+    if mc <= 0 and volume <= 0:
+        return {
+            "subscore": 50.0,
+            "confidence": 0.2,
+            "flags": ["Market data unavailable"],
+            "explanation": "Market data is unavailable, so a neutral market integrity score was applied.",
+            "details": {},
+        }
+
+    # $1M cap scores 0, $100B and up scores 100
+    size_score = clamp((math.log10(mc + 1) - 6.0) / 5.0 * 100.0, 0.0, 100.0)
+
+    # healthy turnover is a few % of cap a day; more than the whole cap smells of wash trading
+    if vol_to_mc >= 1.0:
+        liquidity_score = 40.0
+    elif vol_to_mc >= 0.02:
+        liquidity_score = 100.0
+    else:
+        liquidity_score = clamp(vol_to_mc / 0.02 * 100.0, 0.0, 100.0)
+
+    drawdown_score = 60.0 if ath_change is None else clamp(100.0 + 0.8 * ath_change, 0.0, 100.0)
+
+    dilution = fdv / mc if mc > 0 and fdv > 0 else None
+    dilution_score = 70.0 if dilution is None else clamp(100.0 - (dilution - 1.0) * 40.0, 20.0, 100.0)
+
+    stability_score = clamp(100.0 - abs(change_24h) * 2.0 - abs(change_7d) * 0.5, 0.0, 100.0)
+
+    subscore = (
+        0.25 * liquidity_score +
+        0.25 * size_score +
+        0.20 * drawdown_score +
+        0.15 * dilution_score +
+        0.15 * stability_score
+    )
+
+    confidence = 0.4
+    if mc > 0:
+        confidence += 0.2
+    if volume > 0:
+        confidence += 0.15
+    if ath_change is not None:
+        confidence += 0.1
+    if known_perf >= 3:
+        confidence += 0.1
+    confidence = clamp(confidence, 0.0, 0.9)
+
+    flags = []
+    if vol_to_mc >= 1.0:
+        flags.append("Volume exceeds market cap")
+    elif vol_to_mc < 0.005:
+        flags.append("Thin trading volume")
+    if mc < 10_000_000:
+        flags.append("Micro market cap")
+    if ath_change is not None and ath_change < -80:
+        flags.append("Deep drawdown from ATH")
+    if dilution is not None and dilution > 2.0:
+        flags.append("High FDV dilution")
+    if abs(change_24h) > 20:
+        flags.append("High 24h volatility")
+
+    explanation = (
+        f"Market integrity uses cap size, turnover (vol/mc {round(vol_to_mc, 4)}), "
+        f"ATH drawdown, FDV dilution and recent volatility."
+    )
+
+    return {
+        "subscore": round(clamp(subscore, 0.0, 100.0), 2),
+        "confidence": round(confidence, 2),
+        "flags": flags,
+        "explanation": explanation,
+        "details": {
+            "market_cap_usd": mc,
+            "vol_to_mc_ratio": round(vol_to_mc, 6),
+            "fdv_to_mc_ratio": round(dilution, 4) if dilution is not None else None,
+            "ath_change_percent": ath_change,
+            "size_score": round(size_score, 2),
+            "liquidity_score": round(liquidity_score, 2),
+            "drawdown_score": round(drawdown_score, 2),
+            "dilution_score": round(dilution_score, 2),
+            "stability_score": round(stability_score, 2),
+        },
+    }
+
+
+def score_dev_local(ctx) -> dict:
+    dev = section_of(ctx, "dev_velocity")
+
+    stars = max(0.0, to_float(dev.stars, 0.0))
+    commits_4w = max(0.0, to_float(dev.recent_commits_4w, 0.0))
+    total_issues = max(0.0, to_float(dev.total_issues, 0.0))
+    resolution = clamp(to_float(dev.issue_resolution_rate, 0.0), 0.0, 1.0)
+    last_commit_age = max(0.0, to_float(dev.last_commit_age_days, 0.0))
+
+    if stars <= 0 and commits_4w <= 0 and total_issues <= 0:
+        return {
+            "subscore": 40.0,
+            "confidence": 0.25,
+            "flags": ["No public repository data"],
+            "explanation": "No repository activity is linked, so a below-neutral dev velocity score was applied.",
+            "details": {},
+        }
+
+    # 200 commits in 4 weeks and 50k stars max out their parts
+    activity_score = clamp(math.log10(commits_4w + 1) / math.log10(201) * 100.0, 0.0, 100.0)
+    popularity_score = clamp(math.log10(stars + 1) / math.log10(50001) * 100.0, 0.0, 100.0)
+    resolution_score = resolution * 100.0 if total_issues > 0 else 50.0
+    # fresh up to a month, worthless after a year
+    recency_score = clamp(100.0 - (last_commit_age - 30.0) * 100.0 / 335.0, 0.0, 100.0)
+
+    subscore = (
+        0.40 * activity_score +
+        0.20 * popularity_score +
+        0.20 * resolution_score +
+        0.20 * recency_score
+    )
+
+    confidence = 0.45
+    if commits_4w > 0:
+        confidence += 0.2
+    if total_issues >= 20:
+        confidence += 0.15
+    if stars > 0:
+        confidence += 0.1
+    confidence = clamp(confidence, 0.0, 0.9)
+
+    flags = []
+    if commits_4w <= 0:
+        flags.append("No commits in the last 4 weeks")
+    if total_issues > 0 and resolution < 0.5:
+        flags.append("Low issue resolution rate")
+    if last_commit_age > 180:
+        flags.append("Stale repository")
+
+    explanation = (
+        f"Dev velocity uses {int(commits_4w)} commits in 4 weeks, "
+        f"{round(resolution * 100, 1)}% issue resolution, stars and repository freshness."
+    )
+
+    return {
+        "subscore": round(clamp(subscore, 0.0, 100.0), 2),
+        "confidence": round(confidence, 2),
+        "flags": flags,
+        "explanation": explanation,
+        "details": {
+            "stars": int(stars),
+            "recent_commits_4w": int(commits_4w),
+            "issue_resolution_rate": round(resolution, 4),
+            "last_commit_age_days": int(last_commit_age),
+            "activity_score": round(activity_score, 2),
+            "popularity_score": round(popularity_score, 2),
+            "resolution_score": round(resolution_score, 2),
+            "recency_score": round(recency_score, 2),
+        },
+    }
+
+
+def score_onchain_local(ctx) -> dict:
+    chain = section_of(ctx, "on_chain_security")
+
+    if not chain.present:
+        return {
+            "subscore": 50.0,
+            "confidence": 0.2,
+            "flags": ["On-chain data unavailable"],
+            "explanation": "On-chain data is unavailable, so a neutral on-chain security score was applied.",
+            "details": {},
+        }
+
+    if chain.note:
+        # native L1 asset: no token contract to audit
+        return {
+            "subscore": 70.0,
+            "confidence": 0.4,
+            "flags": ["Native asset: limited contract signals"],
+            "explanation": "Native blockchain asset without a token contract, so contract risks do not apply.",
+            "details": {"note": chain.note},
+        }
+
+    renounced = chain.is_renounced
+    burned = chain.has_burned_liquidity
+    concentration = clamp(to_float(chain.top_holder_concentration, 0.0), 0.0, 100.0)
+    verified = chain.is_contract_verified
+    has_logo = chain.has_logo_verification
+
+    renounced_score = 55.0 if renounced is None else (100.0 if renounced else 30.0)
+    burn_score = 100.0 if burned else 50.0
+    concentration_score = clamp(100.0 - concentration, 0.0, 100.0)
+    verified_score = 100.0 if verified else 20.0
+    logo_score = 100.0 if has_logo else 50.0
+
+    subscore = (
+        0.35 * concentration_score +
+        0.20 * verified_score +
+        0.20 * renounced_score +
+        0.15 * burn_score +
+        0.10 * logo_score
+    )
+
+    confidence = 0.5
+    if renounced is not None:
+        confidence += 0.15
+    if concentration > 0:
+        confidence += 0.1
+    if chain.has_deployer:
+        confidence += 0.05
+    confidence = clamp(confidence, 0.0, 0.85)
+
+    flags = []
+    if concentration > 50:
+        flags.append("Concentrated holders")
+    if not verified:
+        flags.append("Unverified contract")
+    if renounced is False:
+        flags.append("Ownership not renounced")
+    if renounced is None:
+        flags.append("Ownership status unknown")
+
+    explanation = (
+        f"On-chain security uses holder concentration ({round(concentration, 1)}% top transfer share), "
+        f"contract verification, ownership renouncement, liquidity burns and logo verification."
+    )
+
+    return {
+        "subscore": round(clamp(subscore, 0.0, 100.0), 2),
+        "confidence": round(confidence, 2),
+        "flags": flags,
+        "explanation": explanation,
+        "details": {
+            "is_renounced": renounced,
+            "has_burned_liquidity": burned,
+            "top_holder_concentration": round(concentration, 2),
+            "is_contract_verified": verified,
+            "has_logo_verification": has_logo,
+            "concentration_score": round(concentration_score, 2),
+            "renounced_score": round(renounced_score, 2),
+        },
+    }
+
+
+LOCAL_SCORERS = {
+    "market_integrity":  score_market_local,
+    "dev_velocity":      score_dev_local,
+    "on_chain_security": score_onchain_local,
+    "social_sentiment":  score_social,
+}
+
+
 '''
 
 async def ask_agent(client: BackboardClient, assistant_id: str, prompt: str) -> dict:
@@ -200,19 +717,131 @@ async def ask_agent(client: BackboardClient, assistant_id: str, prompt: str) ->
     return extract_json(resp.content)
 '''
 
-async def ask_agent(client: BackboardClient, assistant_id: str, prompt: str) -> dict:
-    thread = await client.create_thread(assistant_id)
-    resp = await client.add_message(
-        thread_id=thread.thread_id,
+def stream_chunk_text(chunk) -> str:
+    # text delta of one streamed event; other events (run status, memory, ...) carry none
+    if isinstance(chunk, str):
+        return chunk
+    if isinstance(chunk, dict):
+        if chunk.get("type") not in (None, "content_streaming"):
+            return ""
+        content = chunk.get("content")
+    else:
+        content = getattr(chunk, "content", None)
+    return content if isinstance(content, str) else ""
+
+
+async def read_agent_stream(client: BackboardClient, thread_id, prompt: str, agent: str) -> str:
+    # Read the reply until its first top-level JSON object closes, then hang up.
+    # Only the tail of the last chunk read is known, so skipped bytes count that.
+    stream = await client.add_message(
+        thread_id=thread_id,
         content=prompt,
-        stream=False,
+        stream=True,
         memory=None
     )
+    scanner = JsonObjectScanner()
+    parts = []
+    try:
+        async for chunk in stream:
+            text = stream_chunk_text(chunk)
+            if not text:
+                continue
+            end = scanner.feed(text)
+            if end is None:
+                parts.append(text)
+                continue
+            parts.append(text[:end])
+            metrics.inc("agent_stream_early_stops", assistant=agent)
+            metrics.inc("agent_stream_skipped_bytes", len(text[end:].encode("utf-8")), assistant=agent)
+            break
+    finally:
+        aclose = getattr(stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
+    return "".join(parts)
+
+
+_thread_pool = None
 
-    raw = resp.content if isinstance(resp.content, str) else str(resp.content)
+def get_thread_pool(client: BackboardClient):
+    # None when pooling is off; a new client (bench fakes) gets a new pool
+    global _thread_pool
+    if THREAD_POOL_SIZE <= 0:
+        return None
+    if _thread_pool is None or _thread_pool.client is not client:
+        _thread_pool = ThreadPool(client, THREAD_POOL_SIZE, THREAD_MAX_USES, THREAD_POOL_MAX_BOUND)
+        _thread_pool.warm(AGENT_IDS.values())
+    return _thread_pool
+
+
+async def close_thread_pool():
+    # deletes the threads nobody used
+    global _thread_pool
+    if _thread_pool is not None:
+        await _thread_pool.close()
+        _thread_pool = None
+
+
+async def _agent_attempt(client: BackboardClient, assistant_id: str, prompt: str, agent: str, coin: str) -> str:
+    # one thread + add_message round; -> raw reply text
+    pool = get_thread_pool(client)
+    lease = None
+    if pool is None:
+        with metrics.span("agent.create_thread", assistant=agent):
+            thread_id = (await client.create_thread(assistant_id)).thread_id
+    else:
+        with metrics.span("agent.lease_thread", assistant=agent):
+            lease = await pool.acquire(assistant_id, coin)
+        thread_id = lease.thread_id
 
+    # a thread only goes back to the pool after a complete turn; a
+    # stream we hung up on may still be writing its reply into it
+    reusable = False
     try:
-        parsed = extract_json(raw)
+        with metrics.span("agent.add_message", assistant=agent):
+            if AGENT_STREAM:
+                return await read_agent_stream(client, thread_id, prompt, agent)
+            resp = await client.add_message(
+                thread_id=thread_id,
+                content=prompt,
+                stream=False,
+                memory=None
+            )
+            reusable = True
+            return resp.content if isinstance(resp.content, str) else str(resp.content)
+    finally:
+        if lease is not None:
+            pool.release(lease, reusable)
+
+
+async def _agent_raw(agent: str, coin: str, prompt: str, call, coins: list = None) -> str:
+    # the raw reply of call(), or the recorded one when replaying; captured if on
+    if _replay is not None:
+        return await _replay.agent(agent, coin, prompt)
+    started = time.perf_counter()
+    try:
+        raw = await call()
+    except Exception as e:
+        if _capture is not None:
+            _capture.agent(agent, coin, prompt, None, time.perf_counter() - started, coins,
+                           error=describe_failure(e))
+        raise
+    if _capture is not None:
+        _capture.agent(agent, coin, prompt, raw, time.perf_counter() - started, coins)
+    return raw
+
+
+async def ask_agent(client: BackboardClient, assistant_id: str, prompt: str, component: str = "",
+                    coin: str = "") -> dict:
+    agent = component or assistant_id
+    raw = await _agent_raw(agent, coin, prompt, lambda: call_with_retries(
+        _agent_limiter, lambda: _agent_attempt(client, assistant_id, prompt, agent, coin),
+        AGENT_RETRIES, RETRY_BASE_S, _transient, _retryable,
+    ))
+
+    try:
+        with metrics.span("agent.parse_json", assistant=agent):
+            parsed = extract_json(raw)
     except Exception as e:
         raise ValueError(
             f"[agent {assistant_id}] did not return valid JSON.\n"
@@ -220,134 +849,813 @@ async def ask_agent(client: BackboardClient, assistant_id: str, prompt: str) ->
             f"ERROR: {e}"
         )
 
-    if not isinstance(parsed, dict):
-        raise TypeError(
-            f"[agent {assistant_id}] expected dict JSON but got {type(parsed)}.\nRAW:\n{raw}"
-        )
+    # a reply we can't score with is rejected here, before it is cached or batched
+    try:
+        verdict = AgentVerdict.parse(parsed)
+    except VerdictError as e:
+        raise VerdictError(f"[agent {assistant_id}] {e}\nRAW:\n{raw}") from None
+    return verdict.to_dict()
 
-    return parsed
 
-def prompt_market(ctx: dict) -> str:
-    return (
+_agent_cache = AgentCache(AGENT_CACHE_MAX_ENTRIES, AGENT_CACHE_DIR) if AGENT_CACHE_MAX_ENTRIES > 0 else None
+
+async def ask_agent_cached(client: BackboardClient, assistant_id: str, prompt: str, component: str = "",
+                           coin: str = "", payload=None) -> tuple:
+    # -> (parsed verdict, cache status reported under result["cache"]["agents"]);
+    # with a payload and AGENT_BATCH_SIZE > 1 the agent is asked in a batch
+    ask = ask_agent
+    if payload is not None and AGENT_BATCH_SIZE > 1 and component in AGENT_IDS and coin:
+        ask = lambda *a: ask_agent_batched(*a, payload)
+    if _agent_cache is None:
+        return await ask(client, assistant_id, prompt, component, coin), "disabled"
+
+    cached, status = _agent_cache.get(assistant_id, prompt)
+    if cached is not None:
+        return cached, status
+
+    # ask() only returns verdicts that passed AgentVerdict.parse
+    parsed = await ask(client, assistant_id, prompt, component, coin)
+    _agent_cache.put(assistant_id, prompt, parsed)
+    return parsed, "miss"
+
+PROMPT_HEADERS = {
+    "market_integrity": (
         "You are a scoring module.\n"
         "Compute ONLY the Market Integrity subscore (0-100).\n"
         "Use ONLY fields under market_integrity (+ optional name/symbol/age_days).\n"
-        "Return ONLY a JSON object with EXACT keys:\n"
-        "subscore (number), confidence (number), flags (string array), explanation (string), details (object).\n"
-        "No markdown. No extra text.\n\n"
-        f"{json.dumps(ctx, ensure_ascii=False)}"
-    )
-
-def prompt_dev(ctx: dict) -> str:
-    return (
+    ),
+    "dev_velocity": (
         "You are a scoring module.\n"
         "Compute ONLY the Dev Velocity subscore (0-100).\n"
         "Use ONLY fields under dev_velocity (+ optional name/symbol/age_days).\n"
-        "Return ONLY a JSON object with EXACT keys:\n"
-        "subscore (number), confidence (number), flags (string array), explanation (string), details (object).\n"
-        "No markdown. No extra text.\n\n"
-        f"{json.dumps(ctx, ensure_ascii=False)}"
-    )
-
-def prompt_onchain(ctx: dict) -> str:
-    return (
+    ),
+    "on_chain_security": (
         "You are a scoring module.\n"
         "Compute ONLY the On-chain Security subscore (0-100).\n"
         "Use ONLY fields under on_chain_security (+ optional name/symbol/age_days).\n"
         "If on_chain_security.note exists, treat as limited contract signals.\n"
-        "Return ONLY a JSON object with EXACT keys:\n"
-        "subscore (number), confidence (number), flags (string array), explanation (string), details (object).\n"
-        "No markdown. No extra text.\n\n"
-        f"{json.dumps(ctx, ensure_ascii=False)}"
-    )
+    ),
+}
 
+PROMPT_FOOTER = (
+    "Return ONLY a JSON object with EXACT keys:\n"
+    "subscore (number), confidence (number), flags (string array), explanation (string), details (object).\n"
+    "No markdown. No extra text.\n\n"
+)
 
+def build_prompt(section: str, ctx) -> str:
+    # the section's JSON was serialized once, when the context was parsed
+    if not isinstance(ctx, CoinContext):
+        ctx = CoinContext.parse(ctx)
+    return PROMPT_HEADERS[section] + PROMPT_FOOTER + ctx.payload_json(section)
 
-async def main():
-    api_key = os.getenv("BACKBOARD_API_KEY", "").strip()
-    client = BackboardClient(api_key=api_key)
+BATCH_FOOTER = (
+    "The input maps coin keys to each coin's fields; score every coin on its own.\n"
+    "Return ONLY a JSON object with the same coin keys, each mapped to an object with EXACT keys:\n"
+    "subscore (number), confidence (number), flags (string array), explanation (string), details (object).\n"
+    "No markdown. No extra text.\n\n"
+)
 
-    # TODO: JS log for contextForAI
-    #coin_name = "btc"  
-    coin_name = sys.argv[1].strip() if len(sys.argv) > 1 else "bitcoin"
-    contextForAI = await get_context_for_ai(coin_name)
-    
+def build_batch_prompt(section: str, items: list) -> str:
+    # items: [(coin key, CoinContext.payload_json(section))], spliced as they are
+    body = ",".join(f"{compact_json(key)}:{payload}" for key, payload in dict(items).items())
+    return PROMPT_HEADERS[section] + BATCH_FOOTER + "{" + body + "}"
 
 
-    # 並行跑更快
-    market, dev, onchain = await asyncio.gather(
-        ask_agent(client, MARKET_AGENT_ID, prompt_market(contextForAI)),
-        ask_agent(client, DEV_AGENT_ID, prompt_dev(contextForAI)),
-        ask_agent(client, ONCHAIN_AGENT_ID, prompt_onchain(contextForAI)),
-    )
-    social = score_social(contextForAI)
-    #print("types:", type(market), type(dev), type(onchain))
-    #print("market raw keys:", list(market.keys())[:10])
-
-
-    # weights
-    w_market, w_dev, w_onchain, w_social = 0.25, 0.20, 0.35, 0.20
-    coverage = w_market + w_dev + w_onchain + w_social
-    master_raw = (
-        w_market * market["subscore"] +
-        w_dev * dev["subscore"] +
-        w_onchain * onchain["subscore"] +
-        w_social * social["subscore"]
-    )
+_batchers = {}   # component -> (client, AgentBatcher)
+
+def get_batcher(client: BackboardClient, component: str) -> AgentBatcher:
+    entry = _batchers.get(component)
+    if entry is not None and entry[0] is client:
+        return entry[1]
+    assistant_id = AGENT_IDS[component]
+
+    def send(items):
+        prompt = build_batch_prompt(component, items)
+        coins = [k for k, _ in items]
+        # the batch key only keeps pooled threads from being reused for other coins
+        key = "batch:" + ",".join(coins)
+        return _agent_raw(component, key, prompt, lambda: call_with_retries(
+            _agent_limiter, lambda: _agent_attempt(client, assistant_id, prompt, component, key),
+            AGENT_RETRIES, RETRY_BASE_S, _transient, _retryable,
+        ), coins)
+
+    batcher = AgentBatcher(send, extract_json, AGENT_BATCH_SIZE, AGENT_BATCH_LINGER_S, AGENT_TIMEOUT_S)
+    _batchers[component] = (client, batcher)
+    return batcher
+
+
+async def ask_agent_batched(client: BackboardClient, assistant_id: str, prompt: str, component: str,
+                            coin: str, payload) -> dict:
+    # a coin the batch didn't answer properly is asked on its own, with the usual prompt
+    try:
+        with metrics.span("agent.batched", assistant=component):
+            parsed = await get_batcher(client, component).submit(coin, payload)
+        return check_verdict(parsed)
+    except (BatchMiss, ValueError):
+        metrics.inc("agent_batch_fallbacks", assistant=component)
+        return await ask_agent(client, assistant_id, prompt, component, coin)
+
+
+def _batch_gauges() -> dict:
+    return {f"{c}_{k}": v for c, (_, b) in _batchers.items() for k, v in b.stats().items() if v is not None}
+
+metrics.register_gauges("agent_batch", _batch_gauges)
+
+def prompt_market(ctx: dict) -> str:
+    return build_prompt("market_integrity", ctx)
+
+def prompt_dev(ctx: dict) -> str:
+    return build_prompt("dev_velocity", ctx)
 
-    master = master_raw / coverage
+def prompt_onchain(ctx: dict) -> str:
+    return build_prompt("on_chain_security", ctx)
+
+
+
+_client = None
+
+# --capture / --replay (capture.py): record every upstream answer, or answer from a recording
+_capture = None
+_replay = None
+
+def start_capture(path: str, meta: dict = None) -> CaptureWriter:
+    global _capture
+    _capture = CaptureWriter(path, meta)
+    return _capture
+
+
+def close_capture():
+    global _capture
+    if _capture is not None:
+        _capture.close()
+        _capture = None
+
+
+def start_replay(path: str, speed: float = 0.0) -> ReplayArchive:
+    # offline and deterministic: nothing else may answer in the recording's place
+    global _replay, _agent_cache, HISTORY_DB
+    _replay = ReplayArchive(path, speed)
+    _agent_cache = None
+    HISTORY_DB = ""
+    return _replay
+
+def get_client() -> BackboardClient:
+    # one client per process so the HTTP connection pool is reused across scorings
+    global _client
+    if _client is None:
+        api_key = os.getenv("BACKBOARD_API_KEY", "").strip()
+        _client = BackboardClient(api_key=api_key)
+    return _client
+
+
+# normalized coin -> task of the scoring currently running for it
+_inflight = {}
+
+metrics.register_gauges("scoring", lambda: {"inflight_coins": len(_inflight)})
+metrics.register_gauges("context_cache", lambda: _context_cache.stats())
+metrics.register_gauges("agent_cache", lambda: _agent_cache.stats() if _agent_cache else {})
+metrics.register_gauges("context_pool", lambda: _context_pool.stats() if _context_pool else {})
+_rescore = RescoreStore(RESCORE_TOLERANCE, RESCORE_MAX_AGE_S, RESCORE_MAX_COINS) if RESCORE_MAX_COINS > 0 else None
+
+_history = None
+_history_tasks = set()
+
+def get_history():
+    # None when disabled; opened on first use so importing doesn't create the file
+    global _history
+    if _history is None and HISTORY_DB:
+        _history = HistoryStore(HISTORY_DB, HISTORY_RAW_KEEP_S, HISTORY_HOURLY_KEEP_S)
+    return _history
+
+
+async def _record_history(coin: str, result: dict):
+    try:
+        store = get_history()
+        if store is not None:
+            await asyncio.to_thread(store.record, coin, result)
+    except Exception:
+        # history is a side record; losing a point must not fail the scoring
+        metrics.inc("history_errors")
 
-    #conf_raw = (
-        #w_market * market.get("confidence", 0.5) +
-        #w_dev * dev.get("confidence", 0.5) +
-        #w_onchain * onchain.get("confidence", 0.5)
-    #)
 
-    conf_raw = (
-        w_market  * normalize_confidence(market.get("confidence")) +
-        w_dev     * normalize_confidence(dev.get("confidence")) +
-        w_onchain * normalize_confidence(onchain.get("confidence")) +
-        w_social  * normalize_confidence(social.get("confidence"))
+async def close_history():
+    # let pending writes land before the process exits
+    if _history_tasks:
+        await asyncio.gather(*list(_history_tasks), return_exceptions=True)
+
+
+async def score_history(coin_name: str, start: float = None, end: float = None, limit: int = 10000):
+    # -> {"coin", "from", "to", "points": [...]}, or None when history is off
+    store = get_history()
+    if store is None:
+        return None
+    coin = _inflight_key(coin_name)
+    with metrics.span("history_query"):
+        points = await asyncio.to_thread(store.query, coin, start, end, limit)
+    return {"coin": coin, "from": start, "to": end, "points": points}
+
+
+_scoreboard = Scoreboard(COMPONENTS, WEIGHT_PROFILES, min(LEADERBOARD_CAPACITY, 1024))
+
+
+def _scoreboard_entry(coin: str, result: dict, ts: float) -> tuple:
+    confidences = result.get("confidences") or {}
+    # rows from before per-component confidences were kept use the master confidence
+    confidences = {c: result["confidence"] if confidences.get(c) is None else confidences[c] for c in COMPONENTS}
+    return coin, result["subscores"], confidences, ts, result.get("coin") or coin
+
+
+def _update_scoreboard(coin: str, result: dict):
+    if result.get("tier") != LEADERBOARD_TIER:
+        return
+    _scoreboard.upsert(*_scoreboard_entry(coin, result, time.time()))
+    while len(_scoreboard) > LEADERBOARD_CAPACITY:
+        _scoreboard.evict_oldest()
+
+
+async def seed_scoreboard() -> int:
+    # load the newest stored result of up to LEADERBOARD_CAPACITY coins; -> coins loaded
+    store = get_history()
+    if store is None:
+        return 0
+    with metrics.span("leaderboard_seed"):
+        rows = await asyncio.to_thread(store.latest, LEADERBOARD_TIER)
+        rows.sort(key=lambda r: r[2]["ts"])
+        rows = rows[-LEADERBOARD_CAPACITY:] if LEADERBOARD_CAPACITY > 0 else []
+        _scoreboard.load(_scoreboard_entry(coin, {**point, "coin": name}, point["ts"]) for coin, name, point in rows)
+    return len(rows)
+
+
+def leaderboard(profile: str = None, k: int = 10, bottom: bool = False, weights: dict = None) -> dict:
+    # top (or bottom) k coins by master score under a named profile, or under
+    # ad-hoc weights (reaggregated over every coin); ValueError on bad input
+    name = (profile or "default").strip().lower()
+    base = resolve_profile(name)
+    with metrics.span("leaderboard"):
+        if weights:
+            weights = check_weights({**base, **weights})
+            entries = _scoreboard.top_weighted(weights, k, bottom)
+            name = "custom"
+        else:
+            entries = _scoreboard.top(name, k, bottom)
+            weights = base
+    return {
+        "profile": name,
+        "tier": LEADERBOARD_TIER,
+        "weights": weights,
+        "order": "bottom" if bottom else "top",
+        "coins": len(_scoreboard),
+        "entries": entries,
+    }
+
+
+_warm = None
+_warm_tier = None
+
+async def start_warm_refresher():
+    # no-op unless a watchlist is configured
+    global _warm, _warm_tier
+    if _warm is not None or not (WARM_COINS or WARM_TOP_N > 0 or WARM_POPULAR_N > 0):
+        return _warm
+
+    watchlist = list(WARM_COINS)
+    if WARM_TOP_N > 0:
+        try:
+            watchlist += await asyncio.to_thread(fetch_top_coins, WARM_TOP_N)
+        except Exception as e:
+            print(f"[warm] could not load the top {WARM_TOP_N} coins: {type(e).__name__}: {e}", file=sys.stderr)
+
+    _warm_tier = resolve_tier(None)
+    costs = {"coingecko": 1, "alchemy": 1, "backboard": 0 if _warm_tier == "fast" else len(AGENT_IDS)}
+    _warm = WarmRefresher(
+        score=lambda coin: _score_single_flight(coin, None, _warm_tier),
+        key=_inflight_key,
+        busy=lambda: len(_inflight) - len(_warm.running) >= WARM_PAUSE_INFLIGHT,
+        watchlist=watchlist,
+        refresh_s=WARM_REFRESH_S,
+        max_age_s=WARM_MAX_AGE_S,
+        popular_n=WARM_POPULAR_N,
+        concurrency=WARM_CONCURRENCY,
+        buckets={name: TokenBucket(rate) for name, rate in WARM_RATES.items()},
+        costs=costs,
     )
+    _warm.start()
+    return _warm
+
+
+async def stop_warm_refresher():
+    global _warm
+    if _warm is not None:
+        await _warm.stop()
+        _warm = None
+
+
+metrics.register_gauges("limiter_context", _context_limiter.stats)
+metrics.register_gauges("limiter_agents", _agent_limiter.stats)
+metrics.register_gauges("warm", lambda: _warm.stats() if _warm else {})
+metrics.register_gauges("history", lambda: _history.stats() if _history else {})
+metrics.register_gauges("rescore", lambda: _rescore.stats() if _rescore else {})
+metrics.register_gauges("thread_pool", lambda: _thread_pool.stats() if _thread_pool else {})
+metrics.register_gauges("leaderboard", _scoreboard.stats)
+metrics.register_gauges("capture", lambda: _capture.stats() if _capture else {})
+metrics.register_gauges("replay", lambda: _replay.stats() if _replay else {})
+
+def _inflight_key(coin_name: str) -> str:
+    # "BTC" and "bitcoin" share a flight once the context cache has seen both
+    key = normalize_coin(coin_name)
+    return _context_cache.aliases.get(key, key)
+
+
+def resolve_tier(tier: str = None) -> str:
+    tier = (tier or SCORING_TIER).strip().lower()
+    if tier not in TIERS:
+        raise ValueError(f"unknown scoring tier '{tier}' (expected one of {', '.join(TIERS)})")
+    return tier
+
+
+def servable_from_cache(coin_name: str, tier: str = None) -> bool:
+    # True if score_coin() would make no upstream call of its own: a fresh warm
+    # result, a scoring of the same coin already running (joined, not repeated),
+    # or a fast-tier score over a cached context. Raises ValueError for a bad tier.
+    tier = resolve_tier(tier)
+    if _warm is not None and tier == _warm_tier and _warm.fresh(coin_name):
+        return True
+    feed = _inflight.get((_inflight_key(coin_name), tier))
+    if feed is not None and not feed.abandoned:
+        return True
+    return tier == "fast" and CONTEXT_CACHE_MAX_BYTES > 0 and _context_cache.servable(coin_name)
+
+
+async def score_coin(coin_name: str, client: BackboardClient = None, tier: str = None) -> dict:
+    tier = resolve_tier(tier)
+    hit = _warm_hit(coin_name, tier)
+    if hit is not None:
+        return hit
+    return await _scoring(coin_name, client, tier).result()
+
+
+def join_score_stream(coin_name: str, tier: str = None):
+    # score_coin() as score_coin_events(), where that needs no scoring of its
+    # own: a fresh warm result replayed as events, or a running scoring of the
+    # same coin and tier (for a stream or a score_coin() caller) followed from
+    # its first event. None otherwise. Bound at call time, so it holds however
+    # long the caller then queues for admission. Raises ValueError for a bad tier.
+    tier = resolve_tier(tier)
+    hit = _warm_hit(coin_name, tier)
+    if hit is not None:
+        return _replay_events(result_events(hit))
+    feed = _inflight.get((_inflight_key(coin_name), tier))
+    if feed is not None and not feed.abandoned:
+        metrics.inc("coalesced_requests")
+        return feed.follow()
+    return None
+
+
+def start_score_stream(coin_name: str, client: BackboardClient = None, tier: str = None):
+    # score_coin_events() of a new scoring, or of one for the same coin and
+    # tier that started since join_score_stream() said None
+    return _scoring(coin_name, client, resolve_tier(tier)).follow()
+
+
+async def _replay_events(events: list):
+    for event in events:
+        yield event
+
+
+def _warm_hit(coin_name: str, tier: str):
+    if _warm is None:
+        return None
+    _warm.note_request(coin_name)
+    hit = _warm.get(coin_name)
+    if hit is None or hit[0].get("tier") != tier:
+        return None
+    metrics.inc("warm_hits")
+    result, age = hit
+    return {**result, "warm_age_s": round(age, 1)}
+
 
-    confidence = conf_raw / coverage
+def result_events(result: dict) -> list:
+    # a finished result as score_coin_events() streams it; per-component flags
+    # aren't kept apart, the master's flags carry them
+    events = [("context", {"coin": result["coin"], "symbol": result.get("symbol"),
+                           "cache": {"status": "warm", "age_s": result.get("warm_age_s")}})]
+    sources = result.get("sources") or {}
+    for c in COMPONENTS:
+        if result["subscores"].get(c) is None:
+            events.append(("subscore", {"component": c, "excluded": True,
+                                        "reason": result.get("excluded_reasons", {}).get(c, "")}))
+        else:
+            events.append(("subscore", {
+                "component": c,
+                "subscore": result["subscores"][c],
+                "confidence": result["confidences"][c],
+                "explanation": result["rationale"].get(c, ""),
+                "details": result["details"].get(DETAIL_KEYS[c], {}),
+                "source": sources.get(c),
+                "cache": "warm",
+            }))
+    events.append(("master", result))
+    return events
+
+
+def _scoring(coin_name: str, client: BackboardClient, tier: str) -> EventFeed:
+    # concurrent callers for the same coin and tier share one computation, so
+    # upstream load is per unique coin rather than per request
+    key = (_inflight_key(coin_name), tier)
+    feed = _inflight.get(key)
+    if feed is not None and not feed.abandoned:
+        metrics.inc("coalesced_requests")
+        return feed
+
+    async def produce(publish):
+        result = None
+        async with contextlib.aclosing(score_coin_events(coin_name, client, tier)) as events:
+            async for event, data in events:
+                publish((event, data))
+                if event == "master":
+                    result = data
+        if _warm is not None and tier == _warm_tier and _warm.is_watched(coin_name):
+            _warm.put(coin_name, result)
+        return result
+
+    feed = EventFeed(produce)
+    _inflight[key] = feed
+
+    def _done(t, key=key, feed=feed):
+        if _inflight.get(key) is feed:
+            del _inflight[key]
+    feed.task.add_done_callback(_done)
+    return feed
+
+
+async def _score_single_flight(coin_name: str, client: BackboardClient, tier: str) -> dict:
+    return await _scoring(coin_name, client, tier).result()
+
+
+async def run_agent(client: BackboardClient, component: str, prompt: str, deadline: float,
+                    coin: str = "", payload=None) -> tuple:
+    # one agent call bounded by both its own timeout and what's left of the request budget
+    timeout = min(AGENT_TIMEOUT_S, deadline - asyncio.get_running_loop().time())
+    if timeout <= 0:
+        raise TimeoutError(f"no time left in the {SCORE_BUDGET_S}s scoring budget")
+    try:
+        parsed, cache_status = await asyncio.wait_for(
+            ask_agent_cached(client, AGENT_IDS[component], prompt, component, coin, payload), timeout
+        )
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"agent timed out after {timeout:.1f}s") from None
+    return check_verdict(parsed), cache_status
+
+
+def describe_failure(e: BaseException) -> str:
+    msg = f"{type(e).__name__}: {e}"
+    return msg if len(msg) <= 300 else msg[:300] + "..."
+
+
+def resolve_profile(profile: str = None) -> dict:
+    profile = (profile or "default").strip().lower()
+    if profile not in WEIGHT_PROFILES:
+        raise ValueError(f"unknown weight profile '{profile}' (expected one of {', '.join(WEIGHT_PROFILES)})")
+    return WEIGHT_PROFILES[profile]
+
+
+def weighted(coin: str, subscores: dict, confidences: dict, weights: dict) -> tuple:
+    # -> (master, confidence, coverage) over the components that have a subscore;
+    # missing ones lower coverage instead of failing the whole score
+    included = [c for c in COMPONENTS if subscores.get(c) is not None]
+    coverage = sum(weights.get(c, 0.0) for c in included)
+    if coverage <= 0:
+        raise RuntimeError(f"no component produced a score for coin='{coin}'")
+
+    master = sum(weights.get(c, 0.0) * subscores[c] for c in included) / coverage
+    confidence = sum(weights.get(c, 0.0) * confidences[c] for c in included) / coverage
+    return master, confidence, coverage
+
+
+def aggregate(coin: str, verdicts: dict, excluded: dict, weights: dict = WEIGHTS) -> dict:
+    included = [c for c in COMPONENTS if c in verdicts]
+    subscores = {c: verdicts[c]["subscore"] if c in verdicts else None for c in COMPONENTS}
+    confidences = {
+        c: normalize_confidence(verdicts[c].get("confidence")) if c in verdicts else None for c in COMPONENTS
+    }
+    master, confidence, coverage = weighted(coin, subscores, confidences, weights)
 
     flags = sorted(set(
-        (market.get("flags", []) or []) +
-        (dev.get("flags", []) or []) +
-        (onchain.get("flags", []) or []) +
-        (social.get("flags", []) or [])
+        f for c in included for f in (verdicts[c].get("flags", []) or [])
     ))
 
-    result = {
-        "coin": contextForAI["name"],
+    return {
+        "coin": coin,
         "master_score": round(master, 2),
         "confidence": round(confidence, 2),
         "coverage": round(coverage, 2),
-        "included_components": ["market_integrity", "dev_velocity", "on_chain_security", "social_sentiment"],
-        "excluded_components": [],
-        "subscores": {
-            "market_integrity": market["subscore"],
-            "dev_velocity": dev["subscore"],
-            "on_chain_security": onchain["subscore"],
-            "social_sentiment": social["subscore"],
-        },
+        "included_components": included,
+        "excluded_components": [c for c in COMPONENTS if c not in verdicts],
+        "excluded_reasons": dict(excluded),
+        "subscores": subscores,
+        "confidences": {c: None if v is None else round(v, 2) for c, v in confidences.items()},
         "flags": flags,
         "rationale": {
-            "market_integrity": market.get("explanation", ""),
-            "dev_velocity": dev.get("explanation", ""),
-            "on_chain_security": onchain.get("explanation", ""),
-            "social_sentiment": social.get("explanation", ""),
+            c: verdicts.get(c, {}).get("explanation", "") for c in COMPONENTS
         },
         "details": {
-            "market": market.get("details", {}),
-            "dev": dev.get("details", {}),
-            "onchain": onchain.get("details", {}),
-            "social": social.get("details", {}),
-        }
+            DETAIL_KEYS[c]: verdicts.get(c, {}).get("details", {}) for c in COMPONENTS
+        },
+    }
+
+
+def reweight(result: dict, profile: str) -> dict:
+    # the same result under another weight profile, from its stored subscores;
+    # no upstream calls. Raises ValueError for an unknown profile.
+    weights = resolve_profile(profile)
+    confidences = result.get("confidences") or {}
+    confidences = {c: confidences.get(c, result["confidence"]) for c in COMPONENTS}
+    master, confidence, coverage = weighted(result["coin"], result["subscores"], confidences, weights)
+    return {
+        **result,
+        "master_score": round(master, 2),
+        "confidence": round(confidence, 2),
+        "coverage": round(coverage, 2),
+        "profile": profile.strip().lower(),
+    }
+
+
+async def _agent_outcome(client: BackboardClient, component: str, prompt: str, deadline: float,
+                         coin: str = "", payload=None) -> tuple:
+    # never raises: -> (component, (verdict, cache status) or None, error or None)
+    try:
+        return component, await run_agent(client, component, prompt, deadline, coin, payload), None
+    except Exception as e:
+        return component, None, e
+
+
+async def score_coin_events(coin_name: str, client: BackboardClient = None, tier: str = None):
+    # Yields (event, data) as the scoring progresses:
+    #   ("context",  {...})        once the context is available
+    #   ("subscore", {...})        once per component, in completion order
+    #   ("master",   result)       the same dict score_coin() returns
+    # Locally scored components (always social_sentiment) follow the context at once.
+    tier = resolve_tier(tier)
+    if tier != "fast" and _replay is None:
+        client = client or get_client()
+    started = time.perf_counter()
+    deadline = asyncio.get_running_loop().time() + SCORE_BUDGET_S
+    timings = metrics.start_timings()
+
+    # without a context there is nothing to score, so this one is fatal
+    with metrics.span("context_fetch"):
+        ctx, context_cache_info = await asyncio.wait_for(
+            get_context_cached(coin_name), SCORE_BUDGET_S
+        )
+    yield "context", {
+        "coin": ctx.name,
+        "symbol": ctx.symbol,
+        "cache": context_cache_info,
+    }
+
+    local = {}
+    with metrics.span("score_social"):
+        local["social_sentiment"] = score_social(ctx)
+    if tier != "full":
+        for c in AGENT_IDS:
+            with metrics.span("score_local", component=c):
+                local[c] = LOCAL_SCORERS[c](ctx)
+
+    if tier == "fast":
+        agent_components = []
+    elif tier == "hybrid":
+        agent_components = [c for c in AGENT_IDS if local[c]["confidence"] < HYBRID_MIN_CONFIDENCE]
+    else:
+        agent_components = list(AGENT_IDS)
+
+    # an agent whose inputs barely moved since its last verdict for this coin isn't asked again
+    coin_key = _inflight_key(coin_name)
+    inputs = {c: ctx.projection(c) for c in COMPONENTS}
+    reused = {}
+    if _rescore is not None:
+        for c in agent_components:
+            hit = _rescore.reusable(coin_key, c, AGENT_IDS[c], inputs[c])
+            if hit is not None:
+                reused[c] = hit
+    prompts = {c: build_prompt(c, ctx) for c in agent_components if c not in reused}
+
+    # 並行跑更快; a slow or broken agent only drops its own component
+    tasks = [
+        asyncio.ensure_future(_agent_outcome(client, c, prompts[c], deadline, coin_key, ctx.payload_json(c)))
+        for c in prompts
+    ]
+
+    verdicts, excluded, agent_cache_info, sources, fallback_reasons = {}, {}, {}, {}, {}
+    try:
+        for component in COMPONENTS:
+            if component in reused:
+                verdicts[component] = reused[component][0]
+                agent_cache_info[component] = "reused"
+                sources[component] = "agent"
+                yield "subscore", {"component": component, **verdicts[component], "source": "agent",
+                                   "cache": "reused"}
+            elif component in local and component not in agent_components:
+                verdicts[component] = local[component]
+                sources[component] = "local"
+                yield "subscore", {"component": component, **verdicts[component], "source": "local"}
+
+        for next_done in asyncio.as_completed(tasks):
+            component, outcome, error = await next_done
+            if error is not None and component in local:
+                # hybrid: the local verdict is still better than nothing
+                fallback_reasons[component] = describe_failure(error)
+                agent_cache_info[component] = "error"
+                verdicts[component] = local[component]
+                sources[component] = "local_fallback"
+                yield "subscore", {"component": component, **verdicts[component], "source": "local_fallback",
+                                   "reason": fallback_reasons[component]}
+            elif error is not None:
+                excluded[component] = describe_failure(error)
+                agent_cache_info[component] = "error"
+                sources[component] = None
+                yield "subscore", {"component": component, "excluded": True, "reason": excluded[component]}
+            else:
+                verdicts[component], agent_cache_info[component] = outcome
+                sources[component] = "agent"
+                if _rescore is not None:
+                    _rescore.record(coin_key, component, AGENT_IDS[component], inputs[component], verdicts[component])
+                yield "subscore", {"component": component, **verdicts[component], "source": "agent",
+                                   "cache": agent_cache_info[component]}
+    finally:
+        # the consumer may stop early (client disconnected): don't leave agents running
+        for t in tasks:
+            t.cancel()
+
+    with metrics.span("aggregate"):
+        result = aggregate(ctx.name, verdicts, excluded)
+    metrics.observe("score_total", time.perf_counter() - started)
+
+    result["details"]["prompt_bytes"] = {k: len(p.encode("utf-8")) for k, p in prompts.items()}
+    result["details"]["input_fingerprints"] = {c: fingerprint(inputs[c])[:16] for c in COMPONENTS}
+    result["cache"] = {
+        "context": context_cache_info,
+        "agents": {c: agent_cache_info.get(c, "local") for c in AGENT_IDS},
     }
+    result["tier"] = tier
+    result["symbol"] = ctx.symbol
+    result["sources"] = {c: sources.get(c) for c in COMPONENTS}
+    result["fallback_reasons"] = fallback_reasons
+    result["recomputed_components"] = [c for c in COMPONENTS if c in verdicts and c not in reused]
+    result["reused_components"] = [c for c in COMPONENTS if c in reused]
+    result["reused_age_s"] = {c: round(age, 1) for c, (_, age) in reused.items()}
+    # snapshot: later spans (e.g. a background cache refresh) must not leak in
+    result["timings"] = list(timings)
+
+    _update_scoreboard(coin_key, result)
+    if HISTORY_DB:
+        task = asyncio.ensure_future(_record_history(coin_key, result))
+        _history_tasks.add(task)
+        task.add_done_callback(_history_tasks.discard)
+    yield "master", result
+
+
+def public_result(result: dict, timings: bool = False) -> dict:
+    # the timings block is opt-in for callers; the shared result keeps it
+    if timings or "timings" not in result:
+        return result
+    return {k: v for k, v in result.items() if k != "timings"}
+
+
+def read_coin_list(path: str) -> list:
+    # one coin per line; blank lines and "#" comments are ignored
+    f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        coins = [line.strip() for line in f]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    return [c for c in coins if c and not c.startswith("#")]
+
 
-    print(json.dumps(result, indent=2, ensure_ascii=False))
+def read_done_coins(path: str) -> set:
+    # coins that already have a successful line in an NDJSON output file
+    done = set()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from an interrupted run
+                if rec.get("ok"):
+                    done.add(rec.get("coin"))
+    except FileNotFoundError:
+        pass
+    return done
+
+
+async def run_batch(coins: list, out, context_concurrency: int, agent_concurrency: int,
+                    timings: bool = False, tier: str = None, profile: str = None) -> dict:
+    # Scores every coin through the shared client, writing one NDJSON line per
+    # coin as it finishes. A failed coin is recorded and the batch goes on.
+    set_concurrency(context=context_concurrency, agents=agent_concurrency)
+
+    queue = asyncio.Queue()
+    for coin in coins:
+        queue.put_nowait(coin)
+    counts = {"ok": 0, "failed": 0}
+
+    async def worker():
+        while True:
+            try:
+                coin = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                result = await score_coin(coin, tier=tier)
+                if profile:
+                    result = reweight(result, profile)
+                rec = {"coin": coin, "ok": True, "result": public_result(result, timings)}
+                counts["ok"] += 1
+            except Exception as e:
+                rec = {"coin": coin, "ok": False, "error": f"{type(e).__name__}: {e}"}
+                counts["failed"] += 1
+            out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            out.flush()
+
+    # enough coins in flight to keep both the context and the agent stage busy
+    n_workers = max(1, context_concurrency + agent_concurrency)
+    await asyncio.gather(*(worker() for _ in range(min(n_workers, len(coins)))))
+    return counts
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Score one coin, or a batch of coins as NDJSON.")
+    parser.add_argument("coin", nargs="?", help="coin to score (default: bitcoin, or every coin in --replay)")
+    parser.add_argument("--batch", metavar="FILE", help="file with one coin id per line ('-' for stdin)")
+    parser.add_argument("--out", metavar="FILE", help="NDJSON output file for --batch (default: stdout)")
+    parser.add_argument("--resume", action="store_true", help="skip coins already scored successfully in --out")
+    parser.add_argument("--context-concurrency", type=int, default=4, help="max concurrent context fetches")
+    parser.add_argument("--agent-concurrency", type=int, default=12, help="max concurrent agent calls")
+    parser.add_argument("--timings", action="store_true", help="include per-stage timings in each result")
+    parser.add_argument("--tier", choices=TIERS, help="scoring tier (default: $SCORING_TIER or full)")
+    parser.add_argument("--profile", choices=list(WEIGHT_PROFILES), help="weight profile for the master score")
+    parser.add_argument("--capture", metavar="FILE", help="record every context and raw agent reply to FILE (.jsonl.gz)")
+    parser.add_argument("--replay", metavar="FILE", help="score from a --capture recording, with no network calls")
+    parser.add_argument("--replay-speed", type=float, default=0.0,
+                        help="replay at this fraction of the recorded latencies (default 0: no waiting)")
+    args = parser.parse_args()
+
+    if args.capture and args.replay:
+        parser.error("--capture and --replay are exclusive")
+    if args.replay:
+        start_replay(args.replay, args.replay_speed)
+    if args.capture:
+        start_capture(args.capture, {"argv": sys.argv[1:], "tier": resolve_tier(args.tier), "weights": WEIGHTS})
+
+    if not args.batch and not (args.replay and args.coin is None):
+        # TODO: JS log for contextForAI
+        #coin_name = "btc"  
+        coin_name = (args.coin or "bitcoin").strip()
+        # one scoring: threads created up front would only be deleted again
+        global THREAD_POOL_SIZE
+        THREAD_POOL_SIZE = 0
+        try:
+            result = await score_coin(coin_name, tier=args.tier)
+        finally:
+            await close_context_pool()
+            await close_history()
+            close_capture()
+        if args.profile:
+            result = reweight(result, args.profile)
+        print(json.dumps(public_result(result, args.timings), indent=2, ensure_ascii=False))
+        return
+
+    if args.resume and not args.out:
+        parser.error("--resume needs --out")
+
+    # --replay without coins re-scores every coin in the recording
+    coins = list(dict.fromkeys(read_coin_list(args.batch) if args.batch else _replay.coins))
+    skipped = 0
+    if args.resume:
+        done = read_done_coins(args.out)
+        skipped = sum(1 for c in coins if c in done)
+        coins = [c for c in coins if c not in done]
+
+    out = open(args.out, "a" if args.resume else "w", encoding="utf-8") if args.out else sys.stdout
+    started = time.time()
+    try:
+        counts = await run_batch(coins, out, args.context_concurrency, args.agent_concurrency,
+                                 args.timings, args.tier, args.profile)
+    finally:
+        await close_context_pool()
+        await close_thread_pool()
+        await close_history()
+        close_capture()
+        if out is not sys.stdout:
+            out.close()
+
+    print(
+        f"[batch] scored {counts['ok']}, failed {counts['failed']}, skipped {skipped} "
+        f"in {time.time() - started:.1f}s",
+        file=sys.stderr,
+    )
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,86 @@
+import copy
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+# Last agent verdict per (coin, component), with the inputs it was computed from.
+#
+# A refreshed context usually only moves market prices; dev and on-chain inputs
+# stay put for days. Before asking an agent again, the orchestrator compares the
+# component's new input section with the one behind the stored verdict: same
+# fingerprint, or every number within `tolerance` relative change and
+# everything else equal, and the stored verdict is reused. The comparison is
+# always against the inputs the verdict was computed from, so slow drift adds
+# up and eventually triggers a rescore.
+
+
+def fingerprint(payload) -> str:
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _is_number(v) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def within_tolerance(old, new, tolerance: float) -> bool:
+    if _is_number(old) and _is_number(new):
+        if old == new:
+            return True
+        scale = max(abs(old), abs(new))
+        return abs(new - old) <= tolerance * scale
+    if isinstance(old, dict) and isinstance(new, dict):
+        return old.keys() == new.keys() and all(within_tolerance(old[k], new[k], tolerance) for k in old)
+    if isinstance(old, list) and isinstance(new, list):
+        return len(old) == len(new) and all(within_tolerance(a, b, tolerance) for a, b in zip(old, new))
+    return old == new
+
+
+class _Record:
+    __slots__ = ("assistant_id", "fingerprint", "inputs", "verdict", "scored_at")
+
+    def __init__(self, assistant_id: str, fp: str, inputs, verdict: dict):
+        self.assistant_id = assistant_id
+        self.fingerprint = fp
+        self.inputs = inputs
+        self.verdict = verdict
+        self.scored_at = time.time()
+
+
+class RescoreStore:
+    def __init__(self, tolerance: float = 0.05, max_age_s: float = 86400.0, max_coins: int = 4096):
+        self.tolerance = tolerance
+        self.max_age_s = max_age_s
+        self.max_coins = max_coins
+        self.coins = OrderedDict()      # coin -> {component: _Record}, LRU
+        self.reused = 0
+        self.recomputed = 0
+
+    def reusable(self, coin: str, component: str, assistant_id: str, inputs):
+        # -> (verdict copy, age in seconds) if the stored verdict still applies, else None
+        record = self.coins.get(coin, {}).get(component)
+        if record is None or record.assistant_id != assistant_id:
+            self.recomputed += 1
+            return None
+        age = time.time() - record.scored_at
+        if age > self.max_age_s:
+            self.recomputed += 1
+            return None
+        if record.fingerprint != fingerprint(inputs) and not within_tolerance(record.inputs, inputs, self.tolerance):
+            self.recomputed += 1
+            return None
+        self.coins.move_to_end(coin)
+        self.reused += 1
+        return copy.deepcopy(record.verdict), age
+
+    def record(self, coin: str, component: str, assistant_id: str, inputs, verdict: dict):
+        components = self.coins.setdefault(coin, {})
+        components[component] = _Record(assistant_id, fingerprint(inputs), copy.deepcopy(inputs),
+                                        copy.deepcopy(verdict))
+        self.coins.move_to_end(coin)
+        while len(self.coins) > self.max_coins:
+            self.coins.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"coins": len(self.coins), "reused": self.reused, "recomputed": self.recomputed}
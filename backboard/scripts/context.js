@@ -0,0 +1,84 @@
+import { fetchCoinGeckoData, searchCoinByName } from '../../services/marketData.js';
+import { fetchAlchemyData } from '../../services/chainData.js';
+import { fetchRedditSleuthData, fetchTwitterSleuthData } from '../../services/socialData.js';
+import { cleanSleuthData } from '../../services/dataCleaner.js';
+
+export const SECTIONS = ['market_integrity', 'dev_velocity', 'on_chain_security', 'social_sentiment'];
+
+// Shared by get_context.js (one-shot CLI) and context_worker.js (long-lived pool worker).
+// Logs go to stderr only: stdout is reserved for JSON.
+//
+// `sections` limits the output (and the upstream calls) to a subset of SECTIONS,
+// so the Python context cache can refresh only what expired. Market and dev
+// data both come from the single CoinGecko call; Alchemy and Reddit/X are
+// skipped unless on_chain_security / social_sentiment are requested.
+export async function buildContext(coinNameOrId, sections = SECTIONS) {
+  let coinId = coinNameOrId;
+  let cgRaw;
+  try {
+    cgRaw = await fetchCoinGeckoData(coinId);
+  } catch {
+    coinId = await searchCoinByName(coinNameOrId);
+    cgRaw = await fetchCoinGeckoData(coinId);
+  }
+
+  const wanted = new Set(sections);
+  const [alchRaw, socialRaw] = await Promise.all([
+    wanted.has('on_chain_security') ? fetchOnChain(coinId, cgRaw) : null,
+    wanted.has('social_sentiment') ? fetchSocial(coinId, cgRaw) : null,
+  ]);
+  const context = cleanSleuthData(cgRaw, alchRaw, socialRaw);
+  for (const section of SECTIONS) {
+    if (!wanted.has(section)) delete context[section];
+  }
+
+  return { coinId: cgRaw.id || coinId, context };
+}
+
+async function fetchOnChain(coinId, cgRaw) {
+  let tokenAddress = cgRaw.platforms?.ethereum || cgRaw.contract_address;
+
+  if (!tokenAddress && cgRaw.asset_platform_id !== 'ethereum') {
+    console.error(`No Ethereum address for ${coinId}, searching for wrapped version...`);
+    try {
+      const wrappedCoinId = await searchCoinByName(`Wrapped ${cgRaw.name}`);
+      const wrappedCgRaw = await fetchCoinGeckoData(wrappedCoinId);
+      tokenAddress = wrappedCgRaw.platforms?.ethereum || wrappedCgRaw.contract_address;
+      if (tokenAddress) {
+        console.error(`Found wrapped version: ${wrappedCoinId} at ${tokenAddress}`);
+      }
+    } catch (e) {
+      console.error(`No wrapped version found for ${cgRaw.name}`);
+    }
+  }
+
+  let alchRaw = null;
+  if (tokenAddress) {
+    try {
+      alchRaw = await fetchAlchemyData(tokenAddress);
+    } catch (e) {
+      // Continue without on-chain data when Alchemy fails for a token/network.
+      console.error(
+        `Alchemy fetch failed for ${coinId} (${tokenAddress}):`,
+        e?.message || String(e),
+      );
+      alchRaw = null;
+    }
+  }
+  return alchRaw;
+}
+
+async function fetchSocial(coinId, cgRaw) {
+  let socialRaw = null;
+  try {
+    const [reddit, twitter] = await Promise.all([
+      fetchRedditSleuthData(cgRaw.links?.subreddit_url),
+      fetchTwitterSleuthData(cgRaw.links?.twitter_screen_name),
+    ]);
+    socialRaw = { reddit, twitter };
+  } catch (e) {
+    console.error(`Social data fetch failed for ${coinId}:`, e?.message || String(e));
+    socialRaw = null;
+  }
+  return socialRaw;
+}
@@ -0,0 +1,42 @@
+import readline from 'node:readline';
+import { buildContext, SECTIONS } from './context.js';
+
+// Long-lived context worker used by backboard/context_pool.py.
+// Protocol: newline-delimited JSON over stdin/stdout.
+//   request:  {"id": 1, "coin": "bitcoin", "sections": ["market_integrity"]}   (sections optional)
+//   response: {"id": 1, "ok": true, "coin_id": "bitcoin", "context": {...}}
+//             {"id": 1, "ok": false, "error": "..."}
+// Requests are handled concurrently; responses may arrive out of order.
+
+// stdout carries protocol lines only, so route any stray logging to stderr.
+console.log = console.error;
+
+function send(msg) {
+  process.stdout.write(JSON.stringify(msg) + "\n");
+}
+
+const rl = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+
+rl.on('line', async (line) => {
+  if (!line.trim()) return;
+
+  let req;
+  try {
+    req = JSON.parse(line);
+  } catch (e) {
+    console.error("context_worker: bad request line:", line.slice(0, 200));
+    return;
+  }
+
+  try {
+    const { coinId, context } = await buildContext(req.coin, req.sections || SECTIONS);
+    send({ id: req.id, ok: true, coin_id: coinId, context });
+  } catch (e) {
+    send({ id: req.id, ok: false, error: e?.stack || e?.message || String(e) });
+  }
+});
+
+// Parent closed our stdin: finish in-flight work and exit.
+rl.on('close', () => {
+  process.exitCode = 0;
+});
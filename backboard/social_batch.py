@@ -0,0 +1,162 @@
+import numpy as np
+
+from models import to_float
+
+# Columnar version of orchestrator.score_social() for batch jobs and
+# leaderboard refreshes. Every arithmetic step mirrors the scalar function in
+# the same order, so for the same inputs the outputs are bit-identical;
+# bench/bench_social.py checks that and measures the speedup.
+
+# flag bitmask, in the order score_social() appends the messages
+FLAG_UNAVAILABLE = 1 << 0
+FLAG_LOW_REDDIT_SIZE = 1 << 1
+FLAG_LOW_REDDIT_ACTIVITY = 1 << 2
+FLAG_NEGATIVE_SENTIMENT = 1 << 3
+FLAG_STRONG_POSITIVE = 1 << 4
+
+FLAG_MESSAGES = (
+    (FLAG_UNAVAILABLE, "Social data unavailable"),
+    (FLAG_LOW_REDDIT_SIZE, "Low Reddit community size"),
+    (FLAG_LOW_REDDIT_ACTIVITY, "Low Reddit activity ratio"),
+    (FLAG_NEGATIVE_SENTIMENT, "Negative sentiment bias"),
+    (FLAG_STRONG_POSITIVE, "Strong positive sentiment"),
+)
+
+
+def decode_flags(mask: int) -> list:
+    return [msg for bit, msg in FLAG_MESSAGES if mask & bit]
+
+
+def _column(values, default: float) -> np.ndarray:
+    # float64 column with the same coercion as to_float(): None and unparseable
+    # values -> default, a NaN (or "nan") stays NaN. Plain numbers convert in
+    # one go; anything else (None, strings, bools) goes through to_float().
+    values = list(values)
+    if all(type(v) in (int, float) for v in values):
+        return np.array(values, dtype=np.float64)
+    return np.array([to_float(v, default) for v in values], dtype=np.float64)
+
+
+def _floor0(x: np.ndarray) -> np.ndarray:
+    # max(0.0, x) as Python evaluates it: NaN -> 0.0
+    return np.where(x > 0.0, x, 0.0)
+
+
+def _clamp(x: np.ndarray, lo: float, hi: float) -> np.ndarray:
+    # orchestrator.clamp(x, lo, hi) == max(lo, min(hi, x)): NaN -> hi
+    x = np.where(x < hi, x, hi)
+    return np.where(x > lo, x, lo)
+
+
+def _round(x: np.ndarray, ndigits: int) -> np.ndarray:
+    # Same values as Python's round(x, ndigits). rint(x * 10**n) / 10**n
+    # disagrees when x * 10**n sits on a .5 tie, or is past 2**52 where the
+    # product itself is already rounded (e.g. an activity ratio of 8e10 at 6
+    # digits), so redo those few (and any inf/NaN) in Python.
+    scale = 10.0 ** ndigits
+    y = x * scale
+    out = np.rint(y) / scale
+    with np.errstate(invalid="ignore"):
+        redo = np.nonzero((np.abs(y - np.floor(y) - 0.5) < 1e-6) | ~(np.abs(y) < 2.0 ** 52))[0]
+    for i in redo:
+        out[i] = round(float(x[i]), ndigits)
+    return out
+
+
+def score_social_batch(reddit_subscribers, reddit_active_accounts_48h,
+                       sentiment_votes_up_pct, sentiment_votes_down_pct,
+                       twitter_followers) -> dict:
+    # the inputs follow score_social()'s NaN behaviour; nothing downstream can be NaN
+    reddit_subscribers = _floor0(_column(reddit_subscribers, 0.0))
+    reddit_active_48h = _floor0(_column(reddit_active_accounts_48h, 0.0))
+    up_pct = _clamp(_column(sentiment_votes_up_pct, 50.0), 0.0, 100.0)
+    down_pct = _clamp(_column(sentiment_votes_down_pct, 50.0), 0.0, 100.0)
+    twitter_followers = _floor0(_column(twitter_followers, 0.0))
+
+    reddit_size_score = np.clip((np.log10(reddit_subscribers + 1) / 6.0) * 100.0, 0.0, 100.0)
+    twitter_size_score = np.clip((np.log10(twitter_followers + 1) / 7.0) * 100.0, 0.0, 100.0)
+
+    active_ratio = reddit_active_48h / np.maximum(reddit_subscribers, 1.0)
+    active_score = np.clip(active_ratio * 5000.0, 0.0, 100.0)
+
+    sentiment_delta = up_pct - down_pct
+    sentiment_score = np.clip(50.0 + (sentiment_delta * 0.5), 0.0, 100.0)
+
+    has_reddit = reddit_subscribers > 0
+    has_sentiment_votes = (up_pct + down_pct) > 0
+    has_twitter = twitter_followers > 0
+    unavailable = ~(has_reddit | has_sentiment_votes | has_twitter)
+
+    subscore = (
+        0.35 * reddit_size_score +
+        0.25 * active_score +
+        0.30 * sentiment_score +
+        0.10 * twitter_size_score
+    )
+    subscore[unavailable] = 50.0
+
+    confidence = np.full(subscore.shape, 0.35)
+    confidence = confidence + np.where(has_reddit, 0.30, 0.0)
+    confidence = confidence + np.where(has_sentiment_votes, 0.25, 0.0)
+    confidence = confidence + np.where(has_twitter, 0.10, 0.0)
+    confidence = np.clip(confidence, 0.0, 0.95)
+    confidence[unavailable] = 0.25
+
+    flags = np.zeros(subscore.shape, dtype=np.uint8)
+    flags |= np.where(reddit_subscribers < 1000, FLAG_LOW_REDDIT_SIZE, 0).astype(np.uint8)
+    flags |= np.where(has_reddit & (active_ratio < 0.002), FLAG_LOW_REDDIT_ACTIVITY, 0).astype(np.uint8)
+    flags |= np.where(sentiment_delta < -10, FLAG_NEGATIVE_SENTIMENT, 0).astype(np.uint8)
+    flags |= np.where(sentiment_delta > 25, FLAG_STRONG_POSITIVE, 0).astype(np.uint8)
+    flags[unavailable] = FLAG_UNAVAILABLE
+
+    return {
+        "subscore": _round(np.clip(subscore, 0.0, 100.0), 2),
+        "confidence": _round(confidence, 2),
+        "flags": flags,
+        "details": {
+            "reddit_subscribers": reddit_subscribers.astype(np.int64),
+            "reddit_active_accounts_48h": reddit_active_48h.astype(np.int64),
+            "reddit_activity_ratio": _round(active_ratio, 6),
+            "sentiment_votes_up_pct": _round(up_pct, 2),
+            "sentiment_votes_down_pct": _round(down_pct, 2),
+            "twitter_followers": twitter_followers.astype(np.int64),
+            "reddit_size_score": _round(reddit_size_score, 2),
+            "activity_score": _round(active_score, 2),
+            "sentiment_score": _round(sentiment_score, 2),
+            "twitter_size_score": _round(twitter_size_score, 2),
+        },
+        # kept for the explanation text; not part of score_social()'s output
+        "_up_pct": up_pct,
+        "_down_pct": down_pct,
+    }
+
+
+def score_social_batch_from_contexts(contexts: list) -> dict:
+    socials = [((ctx or {}).get("social_sentiment", {}) or {}) for ctx in contexts]
+    return score_social_batch(
+        [s.get("reddit_subscribers") for s in socials],
+        [s.get("reddit_active_accounts_48h") for s in socials],
+        [s.get("sentiment_votes_up_pct") for s in socials],
+        [s.get("sentiment_votes_down_pct") for s in socials],
+        [s.get("twitter_followers") for s in socials],
+    )
+
+
+def batch_row(batch: dict, i: int) -> dict:
+    # row i in the exact shape score_social() returns
+    mask = int(batch["flags"][i])
+    if mask & FLAG_UNAVAILABLE:
+        explanation = "Social signals are unavailable, so a neutral social sentiment score was applied."
+    else:
+        explanation = (
+            f"Social sentiment uses Reddit size/activity and vote sentiment "
+            f"(up {round(float(batch['_up_pct'][i]), 1)}%, down {round(float(batch['_down_pct'][i]), 1)}%)."
+        )
+    details = {k: v[i].item() for k, v in batch["details"].items()}
+    return {
+        "subscore": float(batch["subscore"][i]),
+        "confidence": float(batch["confidence"][i]),
+        "flags": decode_flags(mask),
+        "explanation": explanation,
+        "details": details,
+    }
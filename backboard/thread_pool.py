@@ -0,0 +1,174 @@
+import asyncio
+from collections import OrderedDict, deque
+
+# Pre-created Backboard threads, per assistant, so an agent call only costs its
+# add_message round trip.
+#
+# A thread keeps its message history and the assistant sees it on every turn,
+# even with memory=None. So a thread is never shared between coins: fresh
+# threads go to whoever asks first, and with max_uses > 1 a used thread only
+# goes back to calls for the same coin. After max_uses calls (or any failed
+# call, which may leave a half-answered turn behind) the thread is deleted.
+
+
+class Lease:
+    __slots__ = ("assistant_id", "coin", "thread_id", "uses")
+
+    def __init__(self, assistant_id: str, coin: str, thread_id, uses: int):
+        self.assistant_id = assistant_id
+        self.coin = coin
+        self.thread_id = thread_id
+        self.uses = uses
+
+
+class AssistantThreads:
+    def __init__(self, client, assistant_id: str, size: int, max_uses: int, max_bound: int):
+        self.client = client
+        self.assistant_id = assistant_id
+        self.size = size
+        self.max_uses = max_uses
+        self.max_bound = max_bound
+        self.fresh = deque()
+        self.bound = OrderedDict()      # coin -> [(thread_id, uses)], least recently released first
+        self.bound_count = 0
+        self.creating = 0
+        self.hits = 0
+        self.misses = 0
+        self.retired = 0
+        self.create_errors = 0
+        self._refill_task = None
+
+    async def _create(self):
+        thread = await self.client.create_thread(self.assistant_id)
+        return thread.thread_id
+
+    def refill(self):
+        # top the fresh list back up to `size` without blocking the caller
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def _refill(self):
+        while len(self.fresh) + self.creating < self.size:
+            need = self.size - len(self.fresh) - self.creating
+            self.creating += need
+            try:
+                results = await asyncio.gather(*(self._create() for _ in range(need)), return_exceptions=True)
+            finally:
+                self.creating -= need
+            ok = [r for r in results if not isinstance(r, BaseException)]
+            self.fresh.extend(ok)
+            if len(ok) < need:
+                # Backboard is unhappy; acquire() falls back to inline creation
+                self.create_errors += need - len(ok)
+                return
+
+    async def acquire(self, coin: str) -> Lease:
+        threads = self.bound.get(coin)
+        if threads:
+            thread_id, uses = threads.pop()
+            self.bound_count -= 1
+            if not threads:
+                del self.bound[coin]
+            self.hits += 1
+            return Lease(self.assistant_id, coin, thread_id, uses)
+
+        if self.fresh:
+            thread_id = self.fresh.popleft()
+            self.hits += 1
+        else:
+            self.misses += 1
+            thread_id = await self._create()
+        self.refill()
+        return Lease(self.assistant_id, coin, thread_id, 0)
+
+    def release(self, lease: Lease, ok: bool) -> list:
+        # -> thread ids to delete
+        lease.uses += 1
+        if not ok or lease.uses >= self.max_uses:
+            return [lease.thread_id]
+
+        self.bound.setdefault(lease.coin, []).append((lease.thread_id, lease.uses))
+        self.bound.move_to_end(lease.coin)
+        self.bound_count += 1
+
+        retire = []
+        while self.bound_count > self.max_bound:
+            coin, threads = next(iter(self.bound.items()))
+            thread_id, _ = threads.pop(0)
+            self.bound_count -= 1
+            if not threads:
+                del self.bound[coin]
+            retire.append(thread_id)
+        return retire
+
+    def stats(self) -> dict:
+        return {
+            "fresh": len(self.fresh),
+            "bound": self.bound_count,
+            "hits": self.hits,
+            "misses": self.misses,
+            "retired": self.retired,
+            "create_errors": self.create_errors,
+        }
+
+
+class ThreadPool:
+    def __init__(self, client, size: int = 4, max_uses: int = 1, max_bound: int = 64):
+        self.client = client
+        self.size = size
+        self.max_uses = max(1, max_uses)
+        self.max_bound = max_bound
+        self.assistants = {}
+        self._tasks = set()
+
+    def _for(self, assistant_id: str) -> AssistantThreads:
+        threads = self.assistants.get(assistant_id)
+        if threads is None:
+            threads = self.assistants[assistant_id] = AssistantThreads(
+                self.client, assistant_id, self.size, self.max_uses, self.max_bound
+            )
+        return threads
+
+    def warm(self, assistant_ids):
+        for assistant_id in assistant_ids:
+            if assistant_id:
+                self._for(assistant_id).refill()
+
+    async def acquire(self, assistant_id: str, coin: str) -> Lease:
+        return await self._for(assistant_id).acquire(coin)
+
+    def release(self, lease: Lease, ok: bool = True):
+        threads = self._for(lease.assistant_id)
+        for thread_id in threads.release(lease, ok):
+            threads.retired += 1
+            task = asyncio.create_task(self._delete(thread_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _delete(self, thread_id):
+        # best effort; a thread we fail to delete is only clutter
+        try:
+            await self.client.delete_thread(thread_id)
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        totals = {"assistants": len(self.assistants), "deleting": len(self._tasks)}
+        for threads in self.assistants.values():
+            for name, value in threads.stats().items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+    async def close(self):
+        for threads in self.assistants.values():
+            if threads._refill_task is not None:
+                threads._refill_task.cancel()
+        idle = []
+        for threads in self.assistants.values():
+            idle.extend(threads.fresh)
+            for bound in threads.bound.values():
+                idle.extend(thread_id for thread_id, _ in bound)
+            threads.fresh.clear()
+            threads.bound.clear()
+            threads.bound_count = 0
+        await asyncio.gather(*(self._delete(t) for t in idle), *list(self._tasks), return_exceptions=True)
@@ -0,0 +1,241 @@
+import asyncio
+import heapq
+import json
+import os
+import time
+import urllib.request
+
+# Background refresher that keeps a watchlist of coins scored ahead of time.
+#
+# The watchlist is the configured coins (and optionally CoinGecko's top N by
+# market cap) plus the most requested coins. Each tick the refresher picks the
+# due coin with the highest priority, (1 + popularity) * staleness, where
+# popularity is an exponentially decaying request count and staleness is the
+# result's age over the refresh interval. Before each refresh it takes tokens
+# from one bucket per upstream (CoinGecko, Alchemy, Backboard), so its own
+# calls stay under a fixed rate and leave the rest of the quota to interactive
+# requests; it also sits out while interactive scorings are running.
+
+COINGECKO_MARKETS_URL = (
+    "https://api.coingecko.com/api/v3/coins/markets"
+    "?vs_currency=usd&order=market_cap_desc&per_page={n}&page=1"
+)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _fill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, n: float) -> float:
+        # seconds until n tokens are available (0 if they are now)
+        if n > self.capacity:
+            raise ValueError(f"a cost of {n} tokens never fits a bucket of capacity {self.capacity}")
+        self._fill()
+        if self.tokens >= n:
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (n - self.tokens) / self.rate
+
+    def take(self, n: float):
+        self._fill()
+        self.tokens -= n
+
+
+def fetch_top_coins(n: int, timeout: float = 15.0) -> list:
+    # CoinGecko ids of the top n coins by market cap (blocking)
+    req = urllib.request.Request(
+        COINGECKO_MARKETS_URL.format(n=max(1, min(n, 250))),
+        headers={"x-cg-demo-api-key": os.getenv("COINGECKO_API_KEY", ""), "accept": "application/json"},
+    )
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return [row["id"] for row in json.load(resp) if row.get("id")]
+
+
+class WarmRefresher:
+    # score(coin) -> result runs one scoring; key(coin) -> the coin's cache key;
+    # busy() -> True while interactive traffic should have the upstreams to itself
+    def __init__(self, score, key, busy, watchlist: list, refresh_s: float = 300.0, max_age_s: float = 900.0,
+                 popular_n: int = 0, half_life_s: float = 3600.0, concurrency: int = 2,
+                 buckets: dict = None, costs: dict = None):
+        self.score = score
+        self.key = key
+        self.busy = busy
+        self.watchlist = list(dict.fromkeys(watchlist))
+        self.refresh_s = refresh_s
+        self.max_age_s = max_age_s
+        self.popular_n = popular_n
+        self.half_life_s = half_life_s
+        self.concurrency = concurrency
+        self.buckets = buckets or {}
+        self.costs = costs or {}
+        # a refresh takes its whole cost at once, so each bucket must be able to hold it
+        for name, n in self.costs.items():
+            if name in self.buckets and self.buckets[name].capacity < n:
+                self.buckets[name].capacity = float(n)
+        self.results = {}       # key -> (result, scored_at)
+        self.popularity = {}    # key -> (decayed count, updated_at)
+        self.running = set()
+        self.refreshed = 0
+        self.failed = 0
+        self.served = 0
+        self._task = None
+        self._sem = asyncio.Semaphore(concurrency)
+        self._refreshes = set()
+        self._watched = []
+        self._watched_keys = set()
+        self._rank()
+
+    def _decayed(self, key: str, now: float) -> float:
+        count, updated = self.popularity.get(key, (0.0, now))
+        return count * 0.5 ** ((now - updated) / self.half_life_s)
+
+    def note_request(self, coin: str):
+        now = time.time()
+        key = self.key(coin)
+        self.popularity[key] = (self._decayed(key, now) + 1.0, now)
+        if len(self.popularity) > 100_000:
+            # forget the coldest half rather than grow without bound
+            ranked = sorted(self.popularity, key=lambda k: self._decayed(k, now))
+            for k in ranked[: len(ranked) // 2]:
+                del self.popularity[k]
+
+    def _rank(self):
+        # once per tick: the watchlist plus the popular_n most requested coins
+        coins = list(self.watchlist)
+        if self.popular_n > 0:
+            now = time.time()
+            known = {self.key(c) for c in coins}
+            popular = heapq.nlargest(self.popular_n + len(known), self.popularity,
+                                     key=lambda k: self._decayed(k, now))
+            coins += [k for k in popular if k not in known][: self.popular_n]
+        self._watched = coins
+        self._watched_keys = {self.key(c) for c in coins}
+        # results of coins that left the watch set go once they can't be served
+        now = time.time()
+        for key in [k for k, (_, at) in self.results.items()
+                    if k not in self._watched_keys and now - at > self.max_age_s]:
+            del self.results[key]
+
+    def watched(self) -> list:
+        # as of the last tick
+        return list(self._watched)
+
+    def is_watched(self, coin: str) -> bool:
+        return self.key(coin) in self._watched_keys
+
+    def fresh(self, coin: str) -> bool:
+        # get() would serve it; doesn't count as served
+        hit = self.results.get(self.key(coin))
+        return hit is not None and time.time() - hit[1] <= self.max_age_s
+
+    def get(self, coin: str):
+        # -> (result, age_s) for a watched coin fresh enough to serve, else None
+        hit = self.results.get(self.key(coin))
+        if hit is None:
+            return None
+        result, scored_at = hit
+        age = time.time() - scored_at
+        if age > self.max_age_s:
+            return None
+        self.served += 1
+        return result, age
+
+    def put(self, coin: str, result: dict):
+        self.results[self.key(coin)] = (result, time.time())
+
+    def _next_due(self):
+        self._rank()
+        now = time.time()
+        best, best_priority = None, 0.0
+        for coin in self._watched:
+            key = self.key(coin)
+            if key in self.running:
+                continue
+            hit = self.results.get(key)
+            # never scored counts as very stale
+            staleness = 10.0 if hit is None else (now - hit[1]) / self.refresh_s
+            if staleness < 1.0:
+                continue
+            priority = (1.0 + self._decayed(key, now)) * staleness
+            if priority > best_priority:
+                best, best_priority = coin, priority
+        return best
+
+    async def _take_tokens(self):
+        while True:
+            wait = max((self.buckets[name].wait_time(n) for name, n in self.costs.items() if name in self.buckets),
+                       default=0.0)
+            if wait <= 0:
+                break
+            await asyncio.sleep(min(wait, 5.0))
+        for name, n in self.costs.items():
+            if name in self.buckets:
+                self.buckets[name].take(n)
+
+    async def _refresh(self, coin: str, key: str):
+        try:
+            self.put(coin, await self.score(coin))
+            self.refreshed += 1
+        except Exception:
+            self.failed += 1
+        finally:
+            self.running.discard(key)
+            self._sem.release()
+
+    async def _run(self, tick_s: float):
+        while True:
+            await self._sem.acquire()
+            coin = self._next_due()
+            if coin is None or self.busy():
+                self._sem.release()
+                await asyncio.sleep(tick_s)
+                continue
+            key = self.key(coin)
+            self.running.add(key)
+            try:
+                await self._take_tokens()
+            except BaseException:
+                self.running.discard(key)
+                self._sem.release()
+                raise
+            task = asyncio.create_task(self._refresh(coin, key))
+            self._refreshes.add(task)
+            task.add_done_callback(self._refreshes.discard)
+
+    def start(self, tick_s: float = 1.0):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(tick_s))
+
+    async def stop(self):
+        tasks = [t for t in [self._task, *self._refreshes] if t is not None]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    def stats(self) -> dict:
+        now = time.time()
+        fresh = sum(1 for _, at in self.results.values() if now - at <= self.max_age_s)
+        out = {
+            "watched": len(self._watched),
+            "warm": fresh,
+            "refreshing": len(self.running),
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "served": self.served,
+        }
+        for name, bucket in self.buckets.items():
+            bucket._fill()
+            out[f"{name}_tokens"] = round(bucket.tokens, 2)
+        return out
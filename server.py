@@ -1,27 +1,238 @@
-from flask import Flask, request, jsonify
-import subprocess, json, os
+import contextlib, json, os, sys
+from datetime import datetime, timezone
 
-app = Flask(__name__)
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
 
-@app.get("/score")
-def score():
-    coin = request.args.get("coin", "").strip()
+# orchestrator.py lives next to the scripts in backboard/ and imports the
+# backboard SDK by the same name, so load it as a top-level module.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backboard"))
+import metrics
+import orchestrator
+from admission import Admission, QueueFull
+
+# Scorings run on the server's own event loop, next to the agent calls they
+# await, so a request costs a coroutine rather than a thread. Admission caps
+# how many run at once, how many may wait for a slot and for how long
+# (QUEUE_TIMEOUT_S, or less with ?max_wait=). Requests that can be answered
+# from cache take the cached lane and never queue behind upstream-bound ones.
+MAX_INFLIGHT        = int(os.environ.get("MAX_INFLIGHT", "256"))
+MAX_QUEUE           = int(os.environ.get("MAX_QUEUE", "1024"))
+QUEUE_TIMEOUT_S     = float(os.environ.get("QUEUE_TIMEOUT_S", "10"))
+MAX_CACHED_INFLIGHT = int(os.environ.get("MAX_CACHED_INFLIGHT", "512"))
+MAX_CACHED_QUEUE    = int(os.environ.get("MAX_CACHED_QUEUE", "1024"))
+
+admission = Admission(MAX_INFLIGHT, MAX_QUEUE, QUEUE_TIMEOUT_S, "score")
+cached_admission = Admission(MAX_CACHED_INFLIGHT, MAX_CACHED_QUEUE, QUEUE_TIMEOUT_S, "cached")
+metrics.register_gauges("admission", admission.stats)
+metrics.register_gauges("admission_cached", cached_admission.stats)
+
+
+def wants_timings(request: Request) -> bool:
+    return request.query_params.get("timings", "") not in ("", "0", "false")
+
+
+def requested_tier(request: Request) -> str:
+    # ?tier=fast|full|hybrid, else $SCORING_TIER; ValueError if unknown
+    return orchestrator.resolve_tier(request.query_params.get("tier", "").strip() or None)
+
+
+def requested_profile(request: Request):
+    # ?profile=<name> -> the name, or None for the default weights; ValueError if unknown
+    profile = request.query_params.get("profile", "").strip()
+    if profile:
+        orchestrator.resolve_profile(profile)
+    return profile or None
+
+
+def max_wait(request: Request):
+    # ?max_wait=<seconds> the client is willing to queue; ValueError if not a positive number
+    value = request.query_params.get("max_wait", "").strip()
+    if not value:
+        return None
+    seconds = float(value)
+    if not seconds > 0:
+        raise ValueError(f"max_wait must be positive, got {value!r}")
+    return seconds
+
+
+def lane(coin: str, tier: str) -> Admission:
+    return cached_admission if orchestrator.servable_from_cache(coin, tier) else admission
+
+
+def busy(lane: Admission, e: QueueFull) -> JSONResponse:
+    return JSONResponse({"error": "server busy", "reason": str(e), "lane": lane.name, **lane.stats()},
+                        status_code=503, headers={"Retry-After": str(e.retry_after)})
+
+
+async def score(request: Request):
+    coin = request.query_params.get("coin", "").strip()
     if not coin:
-        return jsonify({"error": "missing coin"}), 400
+        return JSONResponse({"error": "missing coin"}, status_code=400)
+    try:
+        tier = requested_tier(request)
+        profile = requested_profile(request)
+        wait = max_wait(request)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    gate = lane(coin, tier)
+    try:
+        async with gate.slot(wait):
+            result = await orchestrator.score_coin(coin, tier=tier)
+    except QueueFull as e:
+        return busy(gate, e)
+    except Exception as e:
+        return JSONResponse({"error": "orchestrator failed", "stderr": f"{type(e).__name__}: {e}"}, status_code=500)
 
-    p = subprocess.run(
-        ["python", "backboard/orchestrator.py", coin],
-        capture_output=True, text=True
-    )
+    if profile:
+        result = orchestrator.reweight(result, profile)
+    return JSONResponse(orchestrator.public_result(result, wants_timings(request)))
 
-    if p.returncode != 0:
-        return jsonify({"error": "orchestrator failed", "stderr": p.stderr, "stdout": p.stdout}), 500
 
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def score_stream(request: Request):
+    # Server-sent events: context, one subscore per component as it lands, master.
+    coin = request.query_params.get("coin", "").strip()
+    if not coin:
+        return JSONResponse({"error": "missing coin"}, status_code=400)
     try:
-        return jsonify(json.loads(p.stdout))
-    except Exception:
-        return jsonify({"error": "bad json", "stdout": p.stdout}), 500
+        tier = requested_tier(request)
+        profile = requested_profile(request)
+        wait = max_wait(request)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    # only a stream already bound to a warm result or a running scoring takes
+    # the cached lane, so it can't turn into an upstream scoring while it queues
+    stream = orchestrator.join_score_stream(coin, tier)
+    gate = cached_admission if stream is not None else lane(coin, tier)
+    try:
+        started = await gate.acquire(wait)
+    except QueueFull as e:
+        return busy(gate, e)
+    if stream is None:
+        stream = orchestrator.start_score_stream(coin, tier=tier)
+
+    timings = wants_timings(request)
+
+    async def events():
+        # if the client goes away, starlette cancels this generator; the
+        # scoring it follows stops once no other stream or /score call needs it
+        try:
+            async with contextlib.aclosing(stream):
+                async for event, data in stream:
+                    if event == "master":
+                        if profile:
+                            data = orchestrator.reweight(data, profile)
+                        data = orchestrator.public_result(data, timings)
+                    yield sse(event, data)
+        except Exception as e:
+            yield sse("error", {"error": "orchestrator failed", "stderr": f"{type(e).__name__}: {e}"})
+        finally:
+            gate.release(started)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def parse_time(value: str):
+    # unix seconds or ISO 8601 ("2026-01-31", "2026-01-31T12:00:00Z"); naive means UTC
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+async def score_history(request: Request):
+    coin = request.query_params.get("coin", "").strip()
+    if not coin:
+        return JSONResponse({"error": "missing coin"}, status_code=400)
+    try:
+        start = parse_time(request.query_params.get("from", ""))
+        end = parse_time(request.query_params.get("to", ""))
+        limit = int(request.query_params.get("limit", "10000"))
+    except ValueError as e:
+        return JSONResponse({"error": f"bad query parameter: {e}"}, status_code=400)
+
+    history = await orchestrator.score_history(coin, start, end, max(1, min(limit, 100000)))
+    if history is None:
+        return JSONResponse({"error": "score history is disabled (HISTORY_DB is empty)"}, status_code=404)
+    return JSONResponse(history)
+
+
+# ?w_market=&w_dev=&w_onchain=&w_social= override the profile's weights
+WEIGHT_PARAMS = {
+    "w_market":  "market_integrity",
+    "w_dev":     "dev_velocity",
+    "w_onchain": "on_chain_security",
+    "w_social":  "social_sentiment",
+}
+
+
+async def leaderboard(request: Request):
+    # top/bottom k coins under a profile, from the subscores already scored; no upstream calls
+    params = request.query_params
+    order = params.get("order", "top").strip().lower()
+    if order not in ("top", "bottom"):
+        return JSONResponse({"error": "order must be top or bottom"}, status_code=400)
+    try:
+        k = max(1, min(int(params.get("k", "10")), 1000))
+        weights = {c: float(params[p]) for p, c in WEIGHT_PARAMS.items() if params.get(p, "").strip()}
+        board = orchestrator.leaderboard(params.get("profile", ""), k, order == "bottom", weights)
+    except ValueError as e:
+        return JSONResponse({"error": f"bad query parameter: {e}"}, status_code=400)
+    return JSONResponse(board)
+
+
+async def metrics_endpoint(request: Request):
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+async def diagnostics(request: Request):
+    # current limiter limits and queue depths, pools, caches and admission, as JSON
+    return JSONResponse(metrics.snapshot())
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # create the agents' first threads before the first request needs them
+    orchestrator.get_thread_pool(orchestrator.get_client())
+    await orchestrator.seed_scoreboard()
+    await orchestrator.start_warm_refresher()
+    yield
+    await orchestrator.stop_warm_refresher()
+    await orchestrator.close_context_pool()
+    await orchestrator.close_thread_pool()
+    await orchestrator.close_history()
+
+
+app = Starlette(
+    routes=[
+        Route("/score", score),
+        Route("/score/stream", score_stream),
+        Route("/score/history", score_history),
+        Route("/leaderboard", leaderboard),
+        Route("/metrics", metrics_endpoint),
+        Route("/diagnostics", diagnostics),
+    ],
+    lifespan=lifespan,
+)
 
 if __name__ == "__main__":
+    import uvicorn
+
     port = int(os.environ.get("PORT", "10000"))
-    app.run(host="0.0.0.0", port=port)
+    uvicorn.run(app, host="0.0.0.0", port=port)